@@ -0,0 +1,73 @@
+import json
+import os
+
+import keyring
+import pytest
+from click.testing import CliRunner
+
+from tests.mock_timed import Dataset, MemoryKeyring, MockTimed, make_token
+from timedctl.cli import timedctl
+from timedctl.tokens import token_bundle
+
+# milliseconds the mock server delays every request
+LATENCY = float(os.getenv("MOCK_TIMED_LATENCY", "0"))
+# multiplies the number of customers, reports and activities
+SCALE = int(os.getenv("MOCK_TIMED_SCALE", "1"))
+
+REQUEST_COUNTS = {}
+
+
+def dataset():
+    """Return the dataset of the benchmarks."""
+    return Dataset(customers=5 * SCALE, reports=20 * SCALE, activities=20 * SCALE)
+
+
+@pytest.fixture()
+def mock_timed(tmp_path, monkeypatch):
+    for name in ("XDG_CONFIG_HOME", "XDG_CACHE_HOME", "XDG_STATE_HOME"):
+        monkeypatch.setenv(name, str(tmp_path / name))
+    monkeypatch.setenv("HOME", str(tmp_path))
+    # don't forward the commands to a running daemon
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    previous = keyring.get_keyring()
+    ring = MemoryKeyring()
+    ring.set_password(
+        "system",
+        "timedctl_token_timedctl",
+        json.dumps(token_bundle(make_token(), make_token(36000))),
+    )
+    keyring.set_keyring(ring)
+    with MockTimed(dataset(), LATENCY / 1000) as mock:
+        config = tmp_path / "XDG_CONFIG_HOME" / "timedctl" / "config.toml"
+        config.parent.mkdir(parents=True)
+        config.write_text(
+            f'username = "test"\n'
+            f'timed_url = "{mock.url}"\n'
+            f'sso_discovery_url = "{mock.url}/realms/test"\n'
+            f'sso_client_id = "timedctl"\n'
+        )
+        yield mock
+    keyring.set_keyring(previous)
+
+
+def run(*args):
+    """Run a timedctl command, it has to succeed."""
+    result = CliRunner().invoke(timedctl, args)
+    assert result.exit_code == 0, result.output
+
+
+def count_requests(benchmark, mock, func, *args):
+    """Call func once and record the number of requests it made."""
+    before = mock.request_count
+    func(*args)
+    requests = mock.request_count - before
+    benchmark.extra_info["requests"] = requests
+    REQUEST_COUNTS[benchmark.name] = requests
+    return requests
+
+
+def pytest_terminal_summary(terminalreporter):
+    if REQUEST_COUNTS:
+        terminalreporter.section("requests per call")
+        for name, requests in REQUEST_COUNTS.items():
+            terminalreporter.write_line(f"{name}: {requests}")
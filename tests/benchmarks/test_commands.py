@@ -0,0 +1,65 @@
+import subprocess
+import sys
+
+import pytest
+
+from tests.benchmarks.conftest import count_requests, dataset, run
+from timedctl.cli import timed
+
+pytest.importorskip("pytest_benchmark")
+
+
+def test_startup(benchmark):
+    benchmark(
+        subprocess.run,
+        [sys.executable, "-m", "timedctl.cli", "--help"],
+        check=True,
+        capture_output=True,
+    )
+
+
+def test_get_reports(benchmark, mock_timed):
+    # the current user and a request per week
+    requests = count_requests(benchmark, mock_timed, run, "get", "reports", "--month")
+    assert requests <= 1 + 6  # noqa: PLR2004
+    benchmark(run, "get", "reports", "--month")
+
+
+def test_get_activities(benchmark, mock_timed):
+    # a request per day
+    requests = count_requests(benchmark, mock_timed, run, "get", "activities", "--week")
+    assert requests <= 7  # noqa: PLR2004
+    benchmark(run, "get", "activities", "--week")
+
+
+def test_stats(benchmark, mock_timed):
+    # the current user, a request per week and the task index
+    requests = count_requests(benchmark, mock_timed, run, "stats", "--month")
+    assert requests <= 1 + 6 + 3  # noqa: PLR2004
+    benchmark(run, "stats", "--month")
+
+
+def test_select_task(benchmark, mock_timed):
+    run("get", "overtime")
+
+    def select_task():
+        timed.task_indexes = {}
+        timed.select_task("Customer 1", "Project 2", "Task 3", show_archived=False)
+
+    # customers, projects and tasks to build the task index
+    assert count_requests(benchmark, mock_timed, select_task) <= 3  # noqa: PLR2004
+    benchmark(select_task)
+
+
+def test_generate_timesheet(benchmark, mock_timed):
+    def reset():
+        mock_timed.dataset = dataset()
+
+    reset()
+    activities = len(mock_timed.dataset.resources["activities"])
+    requests = count_requests(
+        benchmark, mock_timed, run, "activity", "generate-timesheet"
+    )
+    # activities, the user and its reports, then a write per activity and report
+    assert requests <= 3 + 2 * activities
+    benchmark.pedantic(run, ("activity", "generate-timesheet"), setup=reset, rounds=5)
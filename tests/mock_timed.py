@@ -0,0 +1,343 @@
+"""
+Local stand-ins for the Timed JSON:API, its SSO and the system keyring.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import jwt
+from keyring.backend import KeyringBackend
+
+
+def make_token(lifetime=3600):
+    """Return a JWT expiring in `lifetime` seconds."""
+    return jwt.encode({"exp": int(time.time()) + lifetime}, "mock" * 8)
+
+
+class MemoryKeyring(KeyringBackend):
+    """Keyring keeping the passwords in memory."""
+
+    priority = 1
+
+    def __init__(self):
+        super().__init__()
+        self.passwords = {}
+
+    def get_password(self, service, username):
+        return self.passwords.get((service, username))
+
+    def set_password(self, service, username, password):
+        self.passwords[(service, username)] = password
+
+    def delete_password(self, service, username):
+        del self.passwords[(service, username)]
+
+
+class Dataset:
+    """Timed data of a user, with customers * projects * tasks tasks."""
+
+    def __init__(self, customers=5, projects=4, tasks=5, reports=20, activities=20):
+        self.lock = threading.Lock()
+        self.resources = {
+            "customers": {},
+            "projects": {},
+            "tasks": {},
+            "reports": {},
+            "activities": {},
+        }
+        self.next_id = 1
+        for _ in range(customers):
+            customer = self.add("customers", {"name": f"Customer {self.next_id}"})
+            for _ in range(projects):
+                project = self.add(
+                    "projects",
+                    {"name": f"Project {self.next_id}"},
+                    {"customer": customer["id"]},
+                )
+                for _ in range(tasks):
+                    self.add(
+                        "tasks",
+                        {"name": f"Task {self.next_id}"},
+                        {"project": project["id"]},
+                    )
+        task_ids = list(self.resources["tasks"])
+        today = date.today().isoformat()
+        for i in range(reports):
+            self.add(
+                "reports",
+                {
+                    "comment": f"report {i}",
+                    "date": today,
+                    "duration": "01:00:00",
+                    "review": False,
+                    "not-billable": False,
+                },
+                {"task": task_ids[i % len(task_ids)], "user": "1"},
+            )
+        for i in range(activities):
+            start = 8 * 3600 + i * 600
+            self.add(
+                "activities",
+                {
+                    "comment": f"activity {i % 7}",
+                    "date": today,
+                    "from-time": _fmt_time(start),
+                    "to-time": _fmt_time(start + 500),
+                    "transferred": False,
+                    "review": False,
+                    "not-billable": False,
+                },
+                {"task": task_ids[i % len(task_ids)], "user": "1"},
+            )
+
+    def add(self, resource_type, attributes, relationships=None):
+        item = {
+            "type": resource_type,
+            "id": str(self.next_id),
+            "attributes": dict(attributes),
+            "relationships": {},
+        }
+        if resource_type in ("customers", "projects", "tasks"):
+            item["attributes"].setdefault("archived", False)
+        for key, value in (relationships or {}).items():
+            rel_type = "users" if key == "user" else key + "s"
+            item["relationships"][key] = {
+                "data": {"type": rel_type, "id": str(value)} if value else None
+            }
+        self.resources[resource_type][item["id"]] = item
+        self.next_id += 1
+        return item
+
+    def related(self, item, key):
+        """Return the resource a relationship of an item points to."""
+        data = (item["relationships"].get(key) or {}).get("data")
+        if not data:
+            return None
+        return self.resources.get(data["type"], {}).get(data["id"])
+
+
+def _fmt_time(seconds):
+    seconds %= 24 * 3600
+    return f"{seconds // 3600:02}:{seconds % 3600 // 60:02}:{seconds % 60:02}"
+
+
+class MockTimed:
+    """Threaded HTTP server acting as Timed and its SSO.
+
+    Every request is delayed by latency seconds and counted in requests by
+    method and resource.
+    """
+
+    def __init__(self, dataset=None, latency=0.0):
+        self.dataset = dataset or Dataset()
+        self.latency = latency
+        self.requests = Counter()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self):
+        """Return the number of requests served so far."""
+        return sum(self.requests.values())
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):  # noqa: C901
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args, **kwargs):
+                pass
+
+            def _send(self, status, body=None, headers=None):
+                payload = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/vnd.api+json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                if self.headers.get("Content-Type", "").startswith(
+                    "application/x-www-form-urlencoded"
+                ):
+                    return {k: v[0] for k, v in parse_qs(raw.decode()).items()}
+                return json.loads(raw) if raw else {}
+
+            def _route(self, method):
+                time.sleep(mock.latency)
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                parts = [p for p in url.path.split("/") if p]
+                mock.requests[(method, "/".join(parts[:3]))] += 1
+                if url.path.endswith("/.well-known/openid-configuration"):
+                    return self._send(
+                        200,
+                        {
+                            "grant_types_supported": [
+                                "refresh_token",
+                                "urn:ietf:params:oauth:grant-type:device_code",
+                            ],
+                            "token_endpoint": mock.url + "/sso/token",
+                            "device_authorization_endpoint": mock.url + "/sso/device",
+                        },
+                        {"Cache-Control": "max-age=300"},
+                    )
+                if url.path == "/sso/token":
+                    self._body()
+                    return self._send(
+                        200,
+                        {
+                            "access_token": make_token(),
+                            "refresh_token": make_token(36000),
+                        },
+                    )
+                if parts[:2] != ["api", "v1"] or not parts[2:]:
+                    return self._send(404, {"errors": []})
+                resource, item_id = [*parts[2:], None][:2]
+                return getattr(self, f"_{method.lower()}")(resource, item_id, query)
+
+            def _get(self, resource, item_id, query):
+                if resource == "users":
+                    return self._send(
+                        200,
+                        {"data": {"type": "users", "id": "1", "attributes": {}}},
+                    )
+                if resource == "worktime-balances":
+                    return self._send(
+                        200,
+                        {
+                            "data": [
+                                {
+                                    "type": "worktime-balances",
+                                    "id": "1",
+                                    "attributes": {
+                                        "date": date.today().isoformat(),
+                                        "balance": "05:00:00",
+                                    },
+                                }
+                            ]
+                        },
+                    )
+                store = mock.dataset.resources.get(resource)
+                if store is None:
+                    return self._send(404, {"errors": []})
+                with mock.dataset.lock:
+                    if item_id:
+                        if item_id not in store:
+                            return self._send(404, {"errors": []})
+                        items = [store[item_id]]
+                    else:
+                        items = [i for i in store.values() if _matches(i, query)]
+                    body = {
+                        "data": items[0] if item_id else items,
+                        "included": _included(
+                            mock.dataset, items, query.get("include")
+                        ),
+                    }
+                    body = json.loads(json.dumps(body))
+                etag = '"' + hashlib.sha1(json.dumps(body).encode()).hexdigest() + '"'  # noqa: S324
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send(304, headers={"ETag": etag})
+                return self._send(200, body, {"ETag": etag})
+
+            def _post(self, resource, item_id, query):
+                data = self._body()["data"]
+                relationships = {
+                    key: (value.get("data") or {}).get("id")
+                    for key, value in (data.get("relationships") or {}).items()
+                }
+                with mock.dataset.lock:
+                    item = mock.dataset.add(resource, data["attributes"], relationships)
+                return self._send(201, {"data": item})
+
+            def _patch(self, resource, item_id, query):
+                data = self._body()["data"]
+                with mock.dataset.lock:
+                    item = mock.dataset.resources[resource][item_id]
+                    item["attributes"].update(data.get("attributes") or {})
+                return self._send(200, {"data": item})
+
+            def _delete(self, resource, item_id, query):
+                with mock.dataset.lock:
+                    mock.dataset.resources[resource].pop(item_id, None)
+                return self._send(204)
+
+            def do_GET(self):  # noqa: N802
+                self._route("GET")
+
+            def do_POST(self):  # noqa: N802
+                self._route("POST")
+
+            def do_PATCH(self):  # noqa: N802
+                self._route("PATCH")
+
+            def do_DELETE(self):  # noqa: N802
+                self._route("DELETE")
+
+        return Handler
+
+
+def _related_id(item, key):
+    return ((item["relationships"].get(key) or {}).get("data") or {}).get("id")
+
+
+FILTERS = {
+    "archived": lambda item, value: (
+        item["attributes"].get("archived", False) == bool(int(value))
+    ),
+    "customer": lambda item, value: _related_id(item, "customer") == value,
+    "project": lambda item, value: _related_id(item, "project") == value,
+    "task": lambda item, value: _related_id(item, "task") == value,
+    "date": lambda item, value: item["attributes"]["date"] == value,
+    "day": lambda item, value: item["attributes"]["date"] == value,
+    "from_date": lambda item, value: item["attributes"]["date"] >= value,
+    "to_date": lambda item, value: item["attributes"]["date"] <= value,
+    "active": lambda item, value: (
+        value.lower() not in ("true", "1") or not item["attributes"]["to-time"]
+    ),
+    "id": lambda item, value: item["id"] in value.split(","),
+}
+
+
+def _matches(item, query):
+    return all(
+        FILTERS[key](item, value) for key, value in query.items() if key in FILTERS
+    )
+
+
+def _included(dataset, items, include):
+    if not include:
+        return []
+    included = {}
+    for path in include.split(","):
+        for item in items:
+            current = item
+            for step in path.split("."):
+                current = dataset.related(current, step) if current else None
+                if current:
+                    included[(current["type"], current["id"])] = current
+    return list(included.values())
@@ -0,0 +1,32 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from timedctl.aio import AsyncTimed
+
+
+def slow(value):
+    time.sleep(0.2)
+    return value
+
+
+def test_run_is_concurrent_and_ordered():
+    client = SimpleNamespace(
+        reports=SimpleNamespace(get=lambda filters: slow(["report"])),
+        activities=SimpleNamespace(get=lambda filters: slow(["activity"])),
+        users=SimpleNamespace(me={"id": "1"}),
+    )
+    aio = AsyncTimed(client, max_workers=3)
+    start = time.perf_counter()
+    results = aio.run(aio.activities(), aio.reports(), aio.me(), aio.call(slow, 3))
+    assert time.perf_counter() - start < 0.4  # noqa: PLR2004
+    assert results == [["activity"], ["report"], {"id": "1"}, 3]
+
+
+def test_run_reuses_its_loop():
+    aio = AsyncTimed(SimpleNamespace(), max_workers=1)
+
+    async def loop():
+        return asyncio.get_running_loop()
+
+    assert aio.run(loop()) == aio.run(loop())
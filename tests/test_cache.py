@@ -0,0 +1,77 @@
+import os
+import time
+
+from timedctl.cache import Cache, max_age
+
+
+def test_cache_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    cache = Cache.for_user("https://timed.example.com", "test")
+    assert cache.get("customers") is None
+    cache.set("customers", {"data": []}, etag='"abc"')
+    entry = cache.get("customers")
+    assert entry["data"] == {"data": []}
+    assert entry["etag"] == '"abc"'
+    assert cache.fresh(entry)
+    cache.clear()
+    assert cache.get("customers") is None
+
+
+def test_cache_is_keyed_by_url_and_user(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    Cache.for_user("https://timed.example.com", "test").set("customers", [1])
+    assert Cache.for_user("https://timed.example.com", "other").get("customers") is None
+    assert Cache.for_user("https://other.example.com", "test").get("customers") is None
+
+
+def test_cache_expiry_and_revalidation(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    cache = Cache("test", ttl=0)
+    entry = cache.set("customers", [1], etag='"abc"')
+    assert not cache.fresh(entry)
+    entry = cache.revalidated(entry, ttl=60)
+    assert cache.fresh(entry)
+    assert entry["etag"] == '"abc"'
+    assert cache.get("customers")["data"] == [1]
+
+
+def test_cache_lru_eviction(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    cache = Cache("test", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # make "a" the most recently used entry
+    old = time.time() - 60
+    os.utime(cache._path("b"), (old, old))
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_eviction_tolerates_removed_entries(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    cache = Cache("test", max_entries=1)
+    cache.set("a", 1)
+    getmtime = os.path.getmtime
+
+    def removed_meanwhile(path):
+        # another invocation evicts "a" while this one sorts the entries
+        if path == cache._path("a"):
+            raise FileNotFoundError(path)
+        return getmtime(path)
+
+    monkeypatch.setattr(os.path, "getmtime", removed_meanwhile)
+    cache.set("b", 2)
+    assert cache.get("b") is not None
+
+
+def test_max_age():
+    default = 60
+    assert max_age("public, max-age=300", default) == 300  # noqa: PLR2004
+    assert max_age('max-age="120"', default) == 120  # noqa: PLR2004
+    assert max_age("no-store", default) == 0
+    assert max_age("no-cache, max-age=300", default) == 0
+    assert max_age(None, default) == default
+    assert max_age("max-age=soon", default) == default
@@ -0,0 +1,54 @@
+import os
+import threading
+import time
+
+import click
+
+from timedctl.daemon import forward, run_command, serve, socket_path
+from timedctl.helpers import error_handler
+
+
+@click.group()
+def group():
+    pass
+
+
+@group.command()
+@click.argument("name")
+def hello(name):
+    click.echo(f"Hello {name}")
+
+
+@group.command()
+def fail():
+    error_handler("ERR_FAILED")
+
+
+def request(*args):
+    return {"args": list(args), "config": None, "tty": False, "columns": 80}
+
+
+def test_run_command():
+    response = run_command(group, request("hello", "world"), lambda: None)
+    assert response == {"stdout": "Hello world\n", "stderr": "", "exit_code": 0}
+    response = run_command(group, request("fail"), lambda: None)
+    assert response["stdout"] == "Error: ERR_FAILED\n"
+    assert response["exit_code"] == 1
+    response = run_command(group, request("hello"), lambda: None)
+    assert "Missing argument" in response["stderr"]
+    assert response["exit_code"] == 2  # noqa: PLR2004
+
+
+def test_forward(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert forward(request("hello", "world")) is None
+
+    def handle_command(request):
+        return run_command(group, request, lambda: None)
+
+    threading.Thread(
+        target=serve, args=(socket_path(), handle_command), daemon=True
+    ).start()
+    while not os.path.exists(socket_path()):
+        time.sleep(0.01)
+    assert forward(request("hello", "daemon"))["stdout"] == "Hello daemon\n"
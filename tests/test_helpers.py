@@ -0,0 +1,126 @@
+import csv
+import io
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from timedctl.helpers import (
+    date_range,
+    fzf_wrapper,
+    output_formatted,
+    print_table,
+    split_range,
+)
+
+
+def test_date_range():
+    assert date_range() == (date.today(), date.today())
+    assert date_range("2024-02-14") == (date(2024, 2, 14), date(2024, 2, 14))
+    assert date_range("2024-02-14", week=True) == (date(2024, 2, 12), date(2024, 2, 18))
+    assert date_range("2024-02-14", month=True) == (date(2024, 2, 1), date(2024, 2, 29))
+    assert date_range(from_date="2024-01-01", to_date="2024-01-31") == (
+        date(2024, 1, 1),
+        date(2024, 1, 31),
+    )
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"week": True, "month": True},
+        {"day": "2024-01-01", "from_date": "2024-01-01"},
+        {"from_date": "2024-01-02", "to_date": "2024-01-01"},
+        {"day": "yesterday"},
+    ],
+)
+def test_date_range_errors(options):
+    with pytest.raises(SystemExit):
+        date_range(**options)
+
+
+def test_split_range():
+    windows = list(split_range(date(2024, 2, 1), date(2024, 2, 10), 7))
+    assert windows == [
+        (date(2024, 2, 1), date(2024, 2, 7)),
+        (date(2024, 2, 8), date(2024, 2, 10)),
+    ]
+
+
+ROWS = [{"id": "1", "name": 'Customer, "quoted"'}, {"id": "2", "name": "[b]"}]
+
+
+def test_output_formatted_json(capsys):
+    output_formatted(iter(ROWS), "json")
+    assert json.loads(capsys.readouterr().out) == ROWS
+    output_formatted(iter([]), "json")
+    assert json.loads(capsys.readouterr().out) == []
+
+
+def test_output_formatted_ndjson(capsys):
+    output_formatted(iter(ROWS), "ndjson")
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line) for line in lines] == ROWS
+
+
+def test_output_formatted_csv(capsys):
+    output_formatted(iter(ROWS), "csv")
+    rows = list(csv.DictReader(io.StringIO(capsys.readouterr().out)))
+    assert rows == ROWS
+
+
+def test_output_formatted_text(capsys):
+    output_formatted(iter(ROWS), "text")
+    assert capsys.readouterr().out.splitlines()[1] == "[id]: 2, [name]: [b], "
+
+
+def test_fzf_wrapper_maps_duplicate_titles(tmp_path, monkeypatch):
+    # stand-in for fzf picking the second line
+    fzf = tmp_path / "fzf"
+    fzf.write_text(f"#!{sys.executable}\nimport sys\nprint(sys.stdin.readlines()[1])")
+    fzf.chmod(0o755)
+    monkeypatch.setenv("PATH", str(tmp_path))
+    tasks = [{"id": 1, "path": "A > B"}, {"id": 2, "path": "A > B"}]
+    assert fzf_wrapper(iter(tasks), ["path"], "Select: ") is tasks[1]
+
+
+def test_fzf_wrapper_stops_fzf_on_errors(tmp_path, monkeypatch):
+    # stand-in for fzf, which keeps running after its input closed
+    fzf = tmp_path / "fzf"
+    pid_file = tmp_path / "pid"
+    fzf.write_text(
+        f"#!{sys.executable}\nimport os, time\n"
+        f"open({str(pid_file)!r}, 'w').write(str(os.getpid()))\ntime.sleep(60)"
+    )
+    fzf.chmod(0o755)
+    monkeypatch.setenv("PATH", str(tmp_path))
+
+    def objects():
+        yield {"path": "A > B"}
+        while not pid_file.exists():
+            time.sleep(0.01)
+        sys.exit(1)
+
+    with pytest.raises(SystemExit):
+        fzf_wrapper(objects(), ["path"], "Select: ")
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)
+
+
+def test_print_table_lines(capsys):
+    rows = [
+        (["a", "1:00:00"], timedelta(hours=1)),
+        (["b", "0:30:00"], timedelta(minutes=30)),
+    ]
+    total = print_table(["Comment", "Duration"], iter(rows), "Reports:", 1)
+    assert total == timedelta(hours=1, minutes=30)
+    assert capsys.readouterr().out.splitlines() == [
+        "Reports:",
+        "Comment\tDuration",
+        "a\t1:00:00",
+        "b\t0:30:00",
+        "\t1:30:00",
+    ]
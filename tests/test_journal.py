@@ -0,0 +1,68 @@
+import json
+from datetime import timedelta
+
+import pytest
+
+from timedctl.journal import Journal
+from timedctl.timedctl import Timedctl
+
+
+def test_journal_roundtrip(tmp_path):
+    journal = Journal(str(tmp_path / "journal.ndjson"))
+    assert journal.entries() == []
+    journal.append({"type": "stop-activity"})
+    journal.append({"type": "add-report"})
+    assert len(journal) == 2  # noqa: PLR2004
+    assert journal.entries()[0] == {"type": "stop-activity"}
+
+
+def test_journal_remove_keeps_appended_writes(tmp_path):
+    journal = Journal(str(tmp_path / "journal.ndjson"))
+    journal.append({"type": "stop-activity"})
+    replayed = journal.entries()
+    journal.append({"type": "add-report"})
+    journal.remove(len(replayed))
+    assert journal.entries() == [{"type": "add-report"}]
+    journal.remove(1)
+    assert len(journal) == 0
+
+
+def test_journal_single_replay(tmp_path):
+    journal = Journal(str(tmp_path / "journal.ndjson"))
+    with journal.replaying(), pytest.raises(BlockingIOError), journal.replaying():
+        pass
+
+
+@pytest.fixture()
+def timed(tmp_path):
+    timed = Timedctl()
+    timed.journal = Journal(str(tmp_path / "journal.ndjson"))
+    return timed
+
+
+def test_dry_run_lists_writes_verbatim(timed, capsys):
+    operation = {"type": "add-report", "comment": "[review] " + "x" * 100}
+    timed.journal.append(operation)
+    timed.sync_journal(discard_conflicts=False, dry_run=True)
+    assert json.loads(capsys.readouterr().out.splitlines()[0]) == operation
+
+
+def test_replayed_report_created_before(timed, monkeypatch):
+    operation = {
+        "type": "add-report",
+        "date": "2024-01-01",
+        "task": "3",
+        "comment": "work",
+        "duration": "01:30:00",
+    }
+    lookups = []
+
+    def find_report(*args):
+        lookups.append(args)
+        return {"id": "1"}
+
+    monkeypatch.setattr(timed, "_find_report", find_report)
+    # no request is made, the report exists already
+    timed.timed = None
+    timed._apply_add_report(operation, True, "1")
+    assert lookups == [("1", "2024-01-01", "3", "work", timedelta(hours=1.5))]
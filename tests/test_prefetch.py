@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from timedctl.prefetch import Prefetcher, by_recency, hit_rate, remember
+
+
+def test_prefetcher_counts_hits_and_misses():
+    prefetcher = Prefetcher(ThreadPoolExecutor(max_workers=2))
+    prefetcher.start("me", lambda: {"id": "1"})
+    prefetcher.start("unused", lambda: None)
+    assert prefetcher.get("me", lambda: {"id": "2"}) == {"id": "1"}
+    # made again, once the prefetched result is used
+    assert prefetcher.get("me", lambda: {"id": "2"}) == {"id": "2"}
+    stats = prefetcher.stats()
+    assert stats == {"prefetched": 2, "hits": 1, "misses": 1}
+    assert hit_rate(stats) == 0.5  # noqa: PLR2004
+
+
+def test_failed_prefetch_is_retried():
+    def fail():
+        raise ConnectionError
+
+    prefetcher = Prefetcher(ThreadPoolExecutor(max_workers=1))
+    prefetcher.start("current", fail)
+    assert prefetcher.get("current", lambda: "current") == "current"
+    assert prefetcher.stats()["hits"] == 0
+
+
+def test_recent_tasks_first():
+    history = remember(remember([], 3), 1)
+    assert history == [1, 3]
+    entries = [{"id": task_id} for task_id in (1, 2, 3, 4)]
+    assert [entry["id"] for entry in by_recency(entries, history)] == [1, 3, 2, 4]
@@ -0,0 +1,34 @@
+import json
+from datetime import timedelta
+from types import SimpleNamespace
+
+from timedctl.profiling import Profile
+
+
+def test_trace_has_phases_and_requests(tmp_path, capsys):
+    output = tmp_path / "trace.json"
+    profile = Profile(report=True, output=str(output), trace_http=True)
+    with profile.phase("setup"):
+        pass
+    profile.begin("command")
+    profile.response_hook(
+        SimpleNamespace(
+            request=SimpleNamespace(method="GET"),
+            url="https://timed.example.com/api/v1/reports",
+            status_code=200,
+            content=b"{}",
+            elapsed=timedelta(milliseconds=5),
+        )
+    )
+    profile.finish()
+    events = json.loads(output.read_text())["traceEvents"]
+    assert [event["name"] for event in events] == [
+        "setup",
+        "GET https://timed.example.com/api/v1/reports",
+        "command",
+    ]
+    assert events[1]["args"] == {"status": 200, "bytes": 2}
+    assert events[1]["dur"] >= 5000  # noqa: PLR2004
+    err = capsys.readouterr().err
+    assert err.startswith("200 GET https://timed.example.com/api/v1/reports 2 B")
+    assert "Phases:\n  setup" in err
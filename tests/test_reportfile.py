@@ -0,0 +1,104 @@
+import codecs
+import io
+from datetime import date, timedelta
+
+import pytest
+
+from timedctl.cli import import_reports
+from timedctl.reportfile import (
+    RowError,
+    UnknownTaskError,
+    file_format,
+    parse_row,
+    read_rows,
+)
+from timedctl.taskindex import TaskIndex
+
+INDEX = TaskIndex(
+    {
+        "customers": [["1", "Adfinis"]],
+        "projects": [["2", "1", "Timed"]],
+        "tasks": [["3", "2", "Development"]],
+    }
+)
+
+
+def test_read_rows():
+    csv_file = io.StringIO(
+        "date,customer,project,task,comment,duration\n"
+        "2024-01-01,Adfinis,Timed,Development,work,01:30:00\n"
+    )
+    assert [line for line, _ in read_rows(csv_file, "csv")] == [2]
+    ndjson_file = io.StringIO('{"date": "2024-01-01"}\n\nnot json\n')
+    assert list(read_rows(ndjson_file, "ndjson")) == [
+        (1, {"date": "2024-01-01"}),
+        (3, None),
+    ]
+    assert file_format("week.jsonl") == "ndjson"
+    assert file_format("week.csv") == "csv"
+
+
+def test_parse_row():
+    row = {"date": "2024-01-01", "comment": "work", "duration": "01:30:00"}
+    report = parse_row(
+        {**row, "customer": "Adfinis", "project": "Timed", "task": "Development"},
+        INDEX,
+    )
+    assert report == {
+        "date": date(2024, 1, 1),
+        "task": "3",
+        "comment": "work",
+        "duration": timedelta(hours=1, minutes=30),
+    }
+    assert parse_row({**row, "task_id": 3}, INDEX) == report
+
+
+@pytest.mark.parametrize(
+    ("row", "error"),
+    [
+        ({"date": "2024-13-01"}, RowError),
+        ({"date": "2024-01-01", "duration": "1h"}, RowError),
+        ({"date": "2024-01-01", "duration": "01:00:00"}, RowError),
+        (
+            {"date": "2024-01-01", "duration": "01:00:00", "comment": "work"},
+            RowError,
+        ),
+        (
+            {
+                "date": "2024-01-01",
+                "duration": "01:00:00",
+                "comment": "work",
+                "task_id": "4",
+            },
+            UnknownTaskError,
+        ),
+        (None, RowError),
+        *(
+            (
+                {
+                    "date": "2024-01-01",
+                    "duration": duration,
+                    "comment": "work",
+                    "task_id": "3",
+                },
+                RowError,
+            )
+            for duration in ["00:00:00", "-1 23:00:00"]
+        ),
+    ],
+)
+def test_invalid_rows(row, error):
+    with pytest.raises(error):
+        parse_row(row, INDEX)
+
+
+def test_read_rows_of_a_spreadsheet_export(tmp_path):
+    path = tmp_path / "week.csv"
+    path.write_bytes(
+        codecs.BOM_UTF8 + b"date,task_id,comment,duration\n"
+        b"2024-01-01,3,work,01:30:00\n"
+    )
+    (param,) = (param for param in import_reports.params if param.name == "file")
+    with param.type.convert(str(path), param, None) as file:
+        ((_, row),) = read_rows(file, "csv")
+    assert parse_row(row, INDEX)["date"] == date(2024, 1, 1)
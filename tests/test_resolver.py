@@ -0,0 +1,31 @@
+from timedctl.resolver import IncludedResolver, relationship_id
+
+RESPONSE = {
+    "data": [
+        {
+            "type": "activities",
+            "id": "1",
+            "relationships": {"task": {"data": {"type": "tasks", "id": "3"}}},
+        },
+    ],
+    "included": [
+        {"type": "tasks", "id": "3", "attributes": {"name": "Task"}},
+        {"type": "projects", "id": "3", "attributes": {"name": "Project"}},
+    ],
+}
+
+
+def test_relationship_id():
+    assert relationship_id({"data": {"type": "tasks", "id": "3"}}) == "3"
+    assert relationship_id({"type": "tasks", "id": "3"}) == "3"
+    assert relationship_id({"data": None}) is None
+    assert relationship_id(None) is None
+
+
+def test_resolve():
+    resolver = IncludedResolver(RESPONSE)
+    relationship = RESPONSE["data"][0]["relationships"]["task"]
+    assert resolver.resolve("tasks", relationship)["attributes"]["name"] == "Task"
+    assert resolver.resolve("projects", relationship)["attributes"]["name"] == "Project"
+    assert resolver.resolve("customers", relationship) is None
+    assert resolver.resolve("tasks", {"data": None}) is None
@@ -0,0 +1,119 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from timedctl.session import TimedAuth, connections_opened, create_session
+from timedctl.timedctl import Timedctl, WriteError
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    failures = 0
+
+    def do_GET(self):  # noqa: N802
+        status = 200
+        if self.path == "/flaky" and Handler.failures < 2:  # noqa: PLR2004
+            Handler.failures += 1
+            status = 503
+        body = str(self.headers.get("Authorization")).encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+def test_connections_are_reused(server):
+    session = create_session(pool_size=2, retries=0, timeout=5)
+    for _ in range(5):
+        assert session.get(f"{server}/").ok
+    assert connections_opened(session) == 1
+
+
+def test_server_errors_are_retried(server):
+    session = create_session(pool_size=2, retries=3, timeout=5, backoff=0)
+    assert session.get(f"{server}/flaky").ok
+    assert Handler.failures == 2  # noqa: PLR2004
+
+
+def test_auth_is_only_sent_to_timed(server):
+    session = create_session(pool_size=2, retries=0, timeout=5)
+    session.auth = TimedAuth("token", f"{server}/api/v1/")
+    assert session.get(f"{server}/api/v1/reports").text == "Bearer token"
+    assert session.get(f"{server}/sso/token").text == "None"
+
+
+def test_failed_connects_are_not_retried():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    session = create_session(1, 3, 1)
+    with pytest.raises(requests.ConnectionError):
+        session.post(f"http://127.0.0.1:{port}/reports")
+    assert connections_opened(session) == 1
+
+
+class Response:
+    def __init__(self, status):
+        self.status_code = status
+        self.ok = status < 400  # noqa: PLR2004
+        self.reason = "reason"
+        self.content = b"{}"
+
+    def json(self):
+        return {"data": {"id": "1"}}
+
+
+@pytest.fixture()
+def timed(monkeypatch):
+    monkeypatch.setattr("timedctl.timedctl.time.sleep", lambda seconds: None)
+    return Timedctl()
+
+
+def _post(*outcomes):
+    sent = []
+
+    def post():
+        sent.append(1)
+        outcome = outcomes[len(sent) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return Response(outcome)
+
+    return post, sent
+
+
+def test_lost_post_is_looked_up(timed):
+    post, sent = _post(requests.ReadTimeout(), 201)
+    found = {"id": "2"}
+    assert timed._send(post, find=lambda: found) is found
+    assert len(sent) == 1
+    # not created after all
+    post, sent = _post(500, 201)
+    assert timed._send(post, find=lambda: None) == {"id": "1"}
+    assert len(sent) == 2  # noqa: PLR2004
+
+
+def test_unsent_post_is_retried(timed):
+    def find():
+        raise AssertionError
+
+    post, sent = _post(requests.ConnectTimeout(), 429, 201)
+    assert timed._send(post, find=find) == {"id": "1"}
+    assert len(sent) == 3  # noqa: PLR2004
+    post, _ = _post(400)
+    with pytest.raises(WriteError):
+        timed._send(post, find=find)
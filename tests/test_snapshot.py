@@ -0,0 +1,147 @@
+import json
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+from libtimed import TimedAPIClient
+from libtimed.models import Activities, WorktimeBalances
+
+from timedctl.cache import Cache
+from timedctl.journal import Journal
+from timedctl.timedctl import CURRENT_ACTIVITY_KEY, FetchError, SSOError, Timedctl
+
+
+@pytest.fixture()
+def timed(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    timed = Timedctl()
+    timed.config = {}
+    timed.cache = Cache("test")
+    timed.journal = Journal(str(tmp_path / "journal.ndjson"))
+    return timed
+
+
+def test_show_activity_from_snapshot(timed, capsys):
+    timed._save_current_activity(
+        {
+            "task": "Adfinis > Timed > Development",
+            "comment": "work",
+            "start": "2024-01-01T08:30:00",
+        }
+    )
+    timed.show_activity(short=True, template=None)
+    assert capsys.readouterr().out == (
+        "Current activity: Adfinis > Timed > Development  (Since 08:30:00)\n"
+    )
+    timed.show_activity(short=False, template="{task} | {comment} | {start:%H:%M}")
+    assert capsys.readouterr().out == "Adfinis > Timed > Development | work | 08:30\n"
+    # no request was necessary
+    assert timed.timed is None
+
+
+def test_show_activity_without_activity(timed, capsys):
+    timed._save_current_activity(None)
+    with pytest.raises(SystemExit):
+        timed.show_activity(short=True, template=None)
+    assert "ERR_NO_CURRENT_ACTIVITY" in capsys.readouterr().out
+
+
+def test_stale_snapshot_is_checked(timed, monkeypatch):
+    timed.config = {"snapshot_check_interval": 0}
+    timed._save_current_activity(None)
+    assert not timed.cache.fresh(timed.cache.get(CURRENT_ACTIVITY_KEY))
+    fetched = []
+    monkeypatch.setattr(timed, "_fetch_current_activity", lambda: fetched.append(1))
+    with pytest.raises(SystemExit):
+        timed.show_activity(short=True, template=None)
+    assert fetched
+
+
+def test_watch_line(timed):
+    snapshot = {
+        "task": "Adfinis > Timed",
+        "comment": "work",
+        "start": "2024-01-01T08:30:00",
+    }
+    assert timed._watch_line(snapshot, False, "{task} {start:%H:%M}") == (
+        "Adfinis > Timed 08:30"
+    )
+    line = json.loads(timed._watch_line(snapshot, True, None))
+    assert line["active"]
+    assert line["comment"] == "work"
+    assert line["elapsed"] > 0
+    assert json.loads(timed._watch_line(None, True, None)) == {
+        "active": False,
+        "pending": 0,
+    }
+
+
+def test_watch_survives_failures(timed, monkeypatch, capsys):
+    timed.config = {"watch_interval": 0, "watch_max_interval": 0}
+    refreshes = [SSOError("ERR_REFRESHING_TOKEN"), None, None]
+    polls = [FetchError("ERR_FETCHING_DATA_FAILED"), ("etag", None)]
+
+    def refresh_tokens():
+        if error := refreshes.pop(0):
+            raise error
+
+    def poll(etag):
+        if isinstance(result := polls.pop(0), Exception):
+            raise result
+        return result
+
+    def sleep(seconds):
+        if not polls:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(timed, "_refresh_tokens", refresh_tokens)
+    monkeypatch.setattr(timed, "_poll_current_activity", poll)
+    monkeypatch.setattr("timedctl.timedctl.time.sleep", sleep)
+    timed.watch_activity(stream=True, template=None)
+    lines = capsys.readouterr().out.splitlines()
+    # the failed refresh and the failed poll didn't stop the watch
+    assert len(lines) == 3  # noqa: PLR2004
+    assert all(not json.loads(line)["active"] for line in lines)
+
+
+class Session:
+    def __init__(self):
+        self.params = {}
+
+    def get(self, url, params=None, **kwargs):
+        resource = url.rstrip("/").rpartition("/")[2]
+        self.params[resource] = params
+        data = {
+            "me": {"id": "1", "type": "users", "attributes": {}},
+            "worktime-balances": [
+                {
+                    "id": "1",
+                    "type": "worktime-balances",
+                    "attributes": {"date": "2024-01-01", "balance": "01:00:00"},
+                }
+            ],
+        }.get(resource, [])
+        return SimpleNamespace(json=lambda: {"data": data})
+
+
+def test_requests_use_the_current_day(timed, monkeypatch, capsys):
+    # as in a daemon started the day before
+    yesterday = date.today() - timedelta(days=1)
+    for model, name in [(Activities, "day"), (WorktimeBalances, "date")]:
+        filters = [
+            (key, yesterday if key == name else value, transform)
+            for key, value, transform in model.filters
+        ]
+        monkeypatch.setattr(model, "filters", filters)
+    timed.timed = TimedAPIClient("token", "http://timed", "api/v1")
+    timed.timed.session = session = Session()
+    monkeypatch.setattr(timed, "ensure_setup", lambda: None)
+    today = date.today().isoformat()
+    timed._fetch_current_activity()
+    assert session.params["activities"]["day"] == today
+    session.params.clear()
+    timed._prefetch_current_activity()[1]()
+    assert session.params["activities"]["day"] == today
+    timed.get_overtime(None)
+    assert session.params["worktime-balances"]["date"] == today
+    assert "1:00:00" in capsys.readouterr().out
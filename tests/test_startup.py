@@ -0,0 +1,61 @@
+import subprocess
+import sys
+
+# import time of timedctl.cli relative to click alone, which it builds on, so
+# the budget holds on slow or busy machines as well
+STARTUP_BUDGET = 5
+
+HEAVY_MODULES = [
+    "jwt",
+    "keyring",
+    "libtimed",
+    "pyfzf",
+    "requests",
+    "rich.table",
+    "webbrowser",
+]
+
+
+def _run(code, *args):
+    return subprocess.run(
+        [sys.executable, *args, "-c", code],  # noqa: S603
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+
+def _import_time(module):
+    """Return the fastest of a few cold imports of a module in microseconds."""
+    times = []
+    for _ in range(3):
+        result = _run(f"import {module}", "-X", "importtime")
+        # lines look like "import time:  self [us] | cumulative | imported package"
+        times.append(
+            next(
+                int(line.split("|")[1])
+                for line in result.stderr.splitlines()
+                if line.split("|")[-1].strip() == module
+            )
+        )
+    return min(times)
+
+
+def test_cold_start_budget():
+    assert _import_time("timedctl.cli") < STARTUP_BUDGET * _import_time("click")
+
+
+def test_help_does_not_import_heavy_modules():
+    code = f"""
+import sys
+import click
+from timedctl.cli import timedctl
+for args in (["get", "reports", "--help"], ["get"], ["get", "data"], ["--help"]):
+    try:
+        timedctl(args, standalone_mode=False)
+    except (SystemExit, click.ClickException):
+        pass
+print("loaded:", *(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+    result = _run(code)
+    assert result.stdout.splitlines()[-1] == "loaded:"
@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+
+import pytest
+
+from timedctl.stats import ReportColumns, format_duration, pivot, rollups
+from timedctl.timedctl import Timedctl
+
+NAMES = {
+    1: ("Adfinis", "Timed", "Development"),
+    2: ("Adfinis", "Timed", "Review"),
+    3: ("Customer", "Support", "Tickets"),
+}
+
+
+def report(task, day, hours):
+    return {
+        "attributes": {"date": day, "duration": timedelta(hours=hours)},
+        "relationships": {"task": {"data": {"type": "tasks", "id": str(task)}}},
+    }
+
+
+def columns():
+    columns = ReportColumns()
+    columns.extend(
+        [
+            report(1, date(2024, 1, 1), 2),
+            report(2, date(2024, 1, 1), 1),
+            report(3, date(2024, 1, 2), 4),
+            report(1, date(2024, 1, 8), 3),
+            report(4, date(2024, 1, 8), 1),
+        ]
+    )
+    return columns
+
+
+def test_rollups():
+    sums = rollups(columns(), NAMES)
+    hour = 3600
+    assert sums["customer"] == {
+        "Adfinis": 6 * hour,
+        "Customer": 4 * hour,
+        "Unknown customer": hour,
+    }
+    assert list(sums["project"]) == [
+        "Adfinis > Timed",
+        "Customer > Support",
+        "Unknown customer > Unknown project",
+    ]
+    assert sums["weekday"] == {"Mon": 7 * hour, "Tue": 4 * hour}
+    assert sums["week"] == {"2024-W01": 7 * hour, "2024-W02": 4 * hour}
+
+
+def test_pivot():
+    col_keys, rows = pivot(columns(), NAMES, "customer", "week")
+    assert col_keys == ["2024-W01", "2024-W02"]
+    assert [(key, dict(row)) for key, row in rows] == [
+        ("Adfinis", {"2024-W01": 3 * 3600, "2024-W02": 3 * 3600}),
+        ("Customer", {"2024-W01": 4 * 3600}),
+        ("Unknown customer", {"2024-W02": 3600}),
+    ]
+
+
+def test_format_duration():
+    assert format_duration(26 * 3600 + 61) == "26:01:01"
+
+
+@pytest.mark.parametrize(
+    ("by", "pivot_by"),
+    [((), "customer"), (("week",), "week"), (("customer", "task"), "week")],
+)
+def test_invalid_pivot(by, pivot_by, capsys):
+    timed = Timedctl()
+    # rejected before any request
+    with pytest.raises(SystemExit):
+        timed.stats(by, pivot_by, None)
+    assert "ERR_INVALID_PIVOT" in capsys.readouterr().out
@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+
+from timedctl.store import LocalStore
+
+
+def _report(id, day, comment="work"):  # noqa: A002
+    return {
+        "id": id,
+        "type": "reports",
+        "attributes": {"date": day, "comment": comment, "duration": "01:00:00"},
+        "relationships": {"task": {"data": {"type": "tasks", "id": "3"}}},
+    }
+
+
+def test_windows_are_replaced(tmp_path):
+    store = LocalStore(str(tmp_path / "store.sqlite3"))
+    first, last = date(2024, 1, 1), date(2024, 1, 7)
+    store.save(
+        "reports",
+        first,
+        last,
+        {"data": [_report("1", "2024-01-02"), _report("2", "2024-01-05")]},
+        etag='"a"',
+    )
+    # a report deleted on the server disappears with the next sync
+    store.save("reports", first, last, {"data": [_report("2", "2024-01-05")]})
+    assert [item["id"] for item in store.read("reports", first, last)["data"]] == ["2"]
+    assert store.read("reports", first, last, last, last)["data"] == []
+
+
+def test_fresh_windows(tmp_path):
+    store = LocalStore(str(tmp_path / "store.sqlite3"))
+    past, today = date(2024, 1, 1), date.today()
+    store.save("activities", past, past, {"data": []})
+    store.save("activities", today, today, {"data": []})
+    assert store.fresh("activities", past, past, 60)
+    assert not store.fresh("activities", past, past, -1)
+    # today still changes
+    assert not store.fresh("activities", today, today, 60)
+    assert not store.fresh("activities", past + timedelta(days=1), past, 60)
+
+
+def test_forget_resource(tmp_path):
+    store = LocalStore(str(tmp_path / "store.sqlite3"))
+    day = date(2024, 1, 1)
+    store.save("reports", day, day, {"data": [_report("1", "2024-01-01")]})
+    store.forget("reports", "1")
+    assert store.window("reports", day, day) is None
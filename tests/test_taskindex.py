@@ -0,0 +1,70 @@
+import pytest
+
+from timedctl.cache import Cache
+from timedctl.taskindex import TaskIndex, build_task_index
+from timedctl.timedctl import FetchError, Timedctl
+
+
+def resource(resource_id, name, **relationships):
+    return {
+        "id": resource_id,
+        "attributes": {"name": name},
+        "relationships": {
+            key: {"data": {"id": value}} for key, value in relationships.items()
+        },
+    }
+
+
+INDEX = TaskIndex(
+    build_task_index(
+        [resource("1", "Adfinis"), resource("2", "Other")],
+        [
+            resource("1", "Timed", customer="1"),
+            resource("2", "Timed", customer="2"),
+            resource("3", "Archived", customer="3"),
+        ],
+        [
+            resource("1", "Development", project="1"),
+            resource("2", "Support", project="1"),
+            resource("3", "Development", project="2"),
+            resource("4", "Development", project="3"),
+        ],
+    )
+)
+
+
+def test_lookup_by_name():
+    assert INDEX.customer_id("Other") == "2"
+    assert INDEX.project_id("2", "Timed") == "2"
+    assert INDEX.task_id("1", "Support") == "2"
+    assert INDEX.customer_id("Missing") is None
+    assert INDEX.project_id("1", "Archived") is None
+
+
+def test_find():
+    assert [entry["path"] for entry in INDEX.find()] == [
+        "Adfinis > Timed > Development",
+        "Adfinis > Timed > Support",
+        "Other > Timed > Development",
+    ]
+    assert [entry["id"] for entry in INDEX.find(task="Development")] == ["1", "3"]
+    assert [entry["id"] for entry in INDEX.find("Adfinis", "Timed")] == ["1", "2"]
+    assert INDEX.find(project="Archived") == []
+
+
+def test_failed_background_refresh_is_quiet(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    timed = Timedctl()
+    timed.cache = Cache("test")
+    timed.task_indexes = {}
+
+    def fail(archived):
+        raise FetchError("ERR_FETCHING_DATA_FAILED")
+
+    monkeypatch.setattr(timed, "_build_task_index", fail)
+    # the stale index is used, the next invocation tries again
+    timed._refresh_task_index("task-index?archived=0", False)
+    assert capsys.readouterr().out == ""
+    with pytest.raises(SystemExit):
+        timed._task_index(False, rebuild=True)
+    assert "ERR_FETCHING_DATA_FAILED" in capsys.readouterr().out
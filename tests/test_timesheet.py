@@ -0,0 +1,152 @@
+import time
+import timeit
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from timedctl.timedctl import Timedctl
+from timedctl.timesheet import ReportIndex, parse_duration, plan_timesheet
+
+NOW = datetime(2024, 1, 1, 17, 0, 0)
+
+
+def _activity(activity_id, task, comment, start, end, transferred=False):
+    return {
+        "id": activity_id,
+        "attributes": {
+            "comment": comment,
+            "from-time": datetime(1900, 1, 1, *start),
+            "to-time": datetime(1900, 1, 1, *end) if end else None,
+            "transferred": transferred,
+        },
+        "relationships": {"task": {"data": {"type": "tasks", "id": task}}},
+    }
+
+
+def _report(report_id, task, comment, duration):
+    return {
+        "id": report_id,
+        "attributes": {"comment": comment, "duration": duration},
+        "relationships": {"task": {"data": {"type": "tasks", "id": task}}},
+    }
+
+
+def test_plan_timesheet_groups_activities():
+    activities = [
+        _activity("1", "10", "coding", (8, 0), (9, 0)),
+        _activity("2", "10", "coding", (10, 0), (10, 30)),
+        _activity("3", "11", "coding", (11, 0), (12, 0)),
+        _activity("4", "10", "coding", (13, 0), (14, 0), transferred=True),
+    ]
+    reports = [_report("5", "11", "coding", timedelta(hours=1))]
+    writes = {
+        w["task"]: w for w in plan_timesheet(activities, ReportIndex(reports), NOW)
+    }
+
+    assert len(writes) == 2  # noqa: PLR2004
+    assert writes["10"]["duration"] == timedelta(hours=1, minutes=30)
+    assert [a["id"] for a in writes["10"]["activities"]] == ["1", "2"]
+    assert writes["10"]["report"] is None
+    assert writes["11"]["duration"] == timedelta(hours=1)
+    assert writes["11"]["report"]["id"] == "5"
+    assert writes["11"]["total"] == timedelta(hours=2)
+
+
+def test_plan_timesheet_stops_running_activities():
+    activities = [_activity("1", "10", "coding", (16, 0), None)]
+    (write,) = plan_timesheet(activities, ReportIndex([]), NOW)
+    assert write["duration"] == timedelta(hours=1)
+    assert write["activities"][0]["attributes"]["to-time"].time() == NOW.time()
+
+
+def test_parse_duration():
+    assert parse_duration("01:30:00") == timedelta(hours=1, minutes=30)
+    assert parse_duration("2 03:00:05") == timedelta(days=2, hours=3, seconds=5)
+    assert parse_duration(timedelta(hours=1)) == timedelta(hours=1)
+
+
+def test_report_index_updates():
+    index = ReportIndex([_report("5", "11", "coding", "01:00:00")])
+    assert index.get("11", "coding")[1] == timedelta(hours=1)
+    assert index.get("11", "other") == (None, timedelta())
+    index.set("11", "other", _report("6", "11", "other", "00:30:00"))
+    assert index.get("11", "other")[0]["id"] == "6"
+    index.set("11", "coding", index.get("11", "coding")[0], timedelta(hours=2))
+    assert index.get("11", "coding")[1] == timedelta(hours=2)
+
+
+def _plan_with_linear_search(activities, reports):
+    """The report matching generate-timesheet used before the index."""
+    for activity_obj in activities:
+        attr = activity_obj["attributes"]
+        task = activity_obj["relationships"]["task"]["data"]["id"]
+        report = [
+            x
+            for x in reports
+            if x["attributes"]["comment"] == attr["comment"]
+            and x["relationships"]["task"]["data"]["id"] == task
+        ]
+        if report:
+            report[0]["attributes"]["duration"] += attr["to-time"] - attr["from-time"]
+
+
+def test_plan_timesheet_benchmark():
+    size = 2000
+    activities = [
+        _activity(str(i), str(i % 500), f"comment {i}", (8, 0), (9, 0))
+        for i in range(size)
+    ]
+    reports = [
+        _report(str(i), str(i % 500), f"comment {i}", timedelta(hours=1))
+        for i in range(0, size, 2)
+    ]
+
+    start = time.perf_counter()
+    _plan_with_linear_search(activities, reports)
+    linear = time.perf_counter() - start
+
+    def match_with_index():
+        index = ReportIndex(reports)
+        for activity_obj in activities:
+            index.get(
+                activity_obj["relationships"]["task"]["data"]["id"],
+                activity_obj["attributes"]["comment"],
+            )
+        return index
+
+    indexed = min(timeit.repeat(match_with_index, number=1, repeat=5))
+
+    # the linear search is quadratic, the index should win by far
+    assert indexed * 10 < linear
+
+    writes = plan_timesheet(activities, match_with_index(), NOW)
+    assert len(writes) == size
+    assert sum(1 for write in writes if write["report"]) == size // 2
+
+
+def test_transfer_rolls_back_on_errors(monkeypatch):
+    timed = Timedctl()
+    timed.timed = SimpleNamespace(
+        users=SimpleNamespace(me={"id": "1"}),
+        activities=SimpleNamespace(patch="patch activity"),
+        reports=SimpleNamespace(post="post report"),
+    )
+    patched = []
+
+    def send(request, *args, find=None):
+        if request == "post report":
+            # e.g. an unexpected response body
+            raise KeyError("data")
+        patched.append((args[0], args[1]["transferred"]))
+
+    monkeypatch.setattr(timed, "_send", send)
+    activities = [
+        _activity("1", "10", "coding", (8, 0), (9, 0)),
+        _activity("2", "10", "coding", (10, 0), (10, 30)),
+    ]
+    (write,) = plan_timesheet(activities, ReportIndex([]), NOW)
+    with pytest.raises(KeyError):
+        timed._transfer(write, ReportIndex([]))
+    assert patched == [("1", True), ("2", True), ("1", False), ("2", False)]
+    assert not any(a["attributes"]["transferred"] for a in activities)
@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+
+import keyring
+import pytest
+from cryptography.fernet import Fernet
+
+from tests.mock_timed import MemoryKeyring, make_token
+from timedctl.timedctl import SSOError, Timedctl
+from timedctl.tokens import FileStore, KeyringStore, remaining, token_bundle
+
+
+@pytest.fixture()
+def ring():
+    previous = keyring.get_keyring()
+    ring = MemoryKeyring()
+    keyring.set_keyring(ring)
+    yield ring
+    keyring.set_keyring(previous)
+
+
+def test_keyring_store_migrates_legacy_entries(ring):
+    access, refresh = make_token(60), make_token(3600)
+    ring.set_password("system", "timedctl_token_timedctl_access", access)
+    ring.set_password("system", "timedctl_token_timedctl_refresh", refresh)
+    bundle = KeyringStore("timedctl").load()
+    assert bundle["access"] == access
+    assert 0 < remaining(bundle, "access") <= 60  # noqa: PLR2004
+    assert list(ring.passwords) == [("system", "timedctl_token_timedctl")]
+    assert KeyringStore("timedctl").load() == bundle
+
+
+def test_remaining_without_tokens():
+    assert remaining({}, "access") < 0
+    assert remaining(token_bundle(None, None), "refresh") < 0
+
+
+def test_file_store_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path))
+    monkeypatch.setenv("TIMEDCTL_TOKEN_KEY", Fernet.generate_key().decode())
+    store = FileStore("timedctl")
+    assert store.load() is None
+    bundle = token_bundle(make_token(60), make_token(3600))
+    store.save(bundle)
+    assert store.load() == bundle
+    with open(store.path, "rb") as file:
+        assert bundle["refresh"].encode() not in file.read()
+    # a new key makes the tokens unreadable, the user has to log in again
+    monkeypatch.setenv("TIMEDCTL_TOKEN_KEY", Fernet.generate_key().decode())
+    assert store.load() is None
+
+
+def test_background_refresh_is_quiet(capsys, monkeypatch):
+    timed = Timedctl()
+    timed.config = {}
+    timed.tokens = token_bundle(make_token(60), make_token(3600))
+    monkeypatch.setattr(
+        timed, "get_openid_configuration", lambda: {"grant_types_supported": []}
+    )
+    # the command goes on with the current token, nothing to report
+    timed._refresh_in_background()
+    assert capsys.readouterr().out == ""
+    with pytest.raises(SystemExit):
+        timed.refresh_token(timed.tokens["refresh"])
+    assert "ERR_SSO_DOES_NOT_SUPPORT_REFRESH" in capsys.readouterr().out
+
+
+class CountingStore:
+    def __init__(self, bundle):
+        self.bundle = bundle
+        self.loads = 0
+
+    def load(self):
+        self.loads += 1
+        return self.bundle
+
+
+def test_tokens_are_only_reloaded_before_they_expire(monkeypatch):
+    timed = Timedctl()
+    timed.config = {"token_refresh_margin": 5}
+    timed.tokens = token_bundle(make_token(3600), make_token(7200))
+    timed.token_store = store = CountingStore(timed.tokens)
+    timed.session = SimpleNamespace(auth=SimpleNamespace(token=None))
+    timed.timed = SimpleNamespace(token=None)
+    for _ in range(3):
+        timed._refresh_tokens()
+    assert store.loads == 0
+    assert timed.timed.token == timed.tokens["access"]
+    # another invocation refreshed the expiring token already
+    timed.tokens = token_bundle(make_token(60), make_token(7200))
+    timed._refresh_tokens()
+    assert store.loads == 1
+    assert timed.timed.token == store.bundle["access"]
+    # the refresh failed, but another invocation refreshed the token meanwhile
+    refreshed = token_bundle(make_token(3600), make_token(7200))
+    store.bundle = timed.tokens = token_bundle(make_token(60), make_token(7200))
+
+    def request_token_refresh(token):
+        store.bundle = refreshed
+
+    monkeypatch.setattr(timed, "_request_token_refresh", request_token_refresh)
+    timed._refresh_tokens()
+    assert timed.timed.token == refreshed["access"]
+    store.bundle = timed.tokens = token_bundle(make_token(60), make_token(7200))
+    monkeypatch.setattr(timed, "_request_token_refresh", lambda token: None)
+    with pytest.raises(SSOError):
+        timed._refresh_tokens()
@@ -0,0 +1,52 @@
+"""
+Asyncio facade over the blocking calls to the timed API.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncTimed:
+    """Await the calls timedctl makes, so independent ones run concurrently.
+
+    libtimed and requests are blocking, so the calls run in a thread pool
+    and share the pooled session of the client. Every thread running
+    coroutines keeps its event loop for the lifetime of the facade.
+    """
+
+    def __init__(self, timed, max_workers):
+        self.timed = timed
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # the task index is also rebuilt from a background thread
+        self.local = threading.local()
+
+    async def call(self, func, *args, **kwargs):
+        """Await a blocking call."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    def run(self, *coroutines):
+        """Run coroutines concurrently, return their results in order."""
+
+        async def gather():
+            return await asyncio.gather(*coroutines)
+
+        if not hasattr(self.local, "loop"):
+            self.local.loop = asyncio.new_event_loop()
+        return self.local.loop.run_until_complete(gather())
+
+    async def me(self):
+        """Await the current user."""
+        return await self.call(lambda: self.timed.users.me)
+
+    async def reports(self, filters=None, **kwargs):
+        """Await reports, by default the ones of the current user today."""
+        return await self.call(self.timed.reports.get, filters, **kwargs)
+
+    async def activities(self, filters=None, **kwargs):
+        """Await activities, by default the ones of today."""
+        return await self.call(self.timed.activities.get, filters, **kwargs)
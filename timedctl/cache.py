@@ -0,0 +1,133 @@
+"""
+On-disk cache shared across timedctl invocations.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+DEFAULT_TTL = 60 * 60
+DEFAULT_MAX_ENTRIES = 256
+
+
+def cache_home():
+    """Return the timedctl cache directory based on $XDG_CACHE_HOME."""
+    if not os.getenv("HOME"):
+        raise OSError("$HOME is not set")
+
+    xdg_cache_home = os.getenv(
+        "XDG_CACHE_HOME",
+        os.path.join(os.getenv("HOME"), ".cache"),
+    )
+    return os.path.join(xdg_cache_home, "timedctl")
+
+
+def user_namespace(timed_url, username):
+    """Return the directory name of a user on a Timed instance."""
+    return hashlib.sha256(f"{timed_url}\0{username}".encode()).hexdigest()[:16]
+
+
+def _mtime(path):
+    """Return the modification time of a file, 0 if it was removed meanwhile."""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0
+
+
+def max_age(cache_control, default):
+    """Return the lifetime in seconds a Cache-Control header allows."""
+    directives = {}
+    for directive in (cache_control or "").split(","):
+        name, _, value = directive.strip().partition("=")
+        directives[name.lower()] = value.strip('"')
+    if "no-store" in directives or "no-cache" in directives:
+        return 0
+    try:
+        return int(directives["max-age"])
+    except (KeyError, ValueError):
+        return default
+
+
+class Cache:
+    """JSON file cache with per-entry expiry and LRU eviction."""
+
+    def __init__(self, namespace, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.directory = os.path.join(cache_home(), namespace)
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    @classmethod
+    def for_user(cls, timed_url, username, **kwargs):
+        """Return the cache of a user on a Timed instance."""
+        return cls(user_namespace(timed_url, username), **kwargs)
+
+    def _path(self, key):
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, key):
+        """Return the entry stored for a key, even if it is stale."""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as file:
+                entry = json.load(file)
+            # the modification time doubles as the LRU timestamp
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def fresh(self, entry):
+        """Check whether an entry can be used without revalidation."""
+        return entry["expires"] > time.time()
+
+    def set(self, key, data, ttl=None, etag=None, last_modified=None):
+        """Store data for a key and return the new entry."""
+        entry = {
+            "key": key,
+            "expires": time.time() + (self.ttl if ttl is None else ttl),
+            "etag": etag,
+            "last_modified": last_modified,
+            "data": data,
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        # write atomically, concurrent invocations might read the entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+        return entry
+
+    def revalidated(self, entry, ttl=None):
+        """Extend the lifetime of an entry the server confirmed unchanged."""
+        return self.set(
+            entry["key"],
+            entry["data"],
+            ttl,
+            entry["etag"],
+            entry["last_modified"],
+        )
+
+    def _evict(self):
+        paths = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".json")
+        ]
+        if len(paths) <= self.max_entries:
+            return
+        paths.sort(key=_mtime)
+        for path in paths[: len(paths) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove all entries."""
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -1,23 +1,145 @@
 #!/usr/bin/env python
 """CLI application for libtimed."""
 
+import shutil
+import sys
+
 import click
+import rich
 from click_aliases import ClickAliasedGroup
 
-from timedctl.helpers import error_handler
+from timedctl.helpers import error_handler, msg
+from timedctl.profiling import Profile
 from timedctl.timedctl import Timedctl
 
 timed = Timedctl()
 
 
-@click.group(cls=ClickAliasedGroup)
+def date_range_options(func):
+    """Add the options selecting a date or a range of dates."""
+    options = [
+        click.option("--date", "day", default=None),
+        click.option("--from", "from_date", default=None),
+        click.option("--to", "to_date", default=None),
+        click.option("--week", default=False, is_flag=True),
+        click.option("--month", default=False, is_flag=True),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+class TimedctlGroup(ClickAliasedGroup):
+    """Root group remembering the arguments of the invoked subcommand."""
+
+    def resolve_command(self, ctx, args):
+        """Resolve the subcommand before the group callback is invoked."""
+        cmd_name, cmd, cmd_args = super().resolve_command(ctx, args)
+        ctx.meta["timedctl.subcommand"] = (cmd, list(cmd_args))
+        return cmd_name, cmd, cmd_args
+
+
+def forwardable(command):
+    """Mark a command the daemon can run, it must not prompt for input."""
+    command.forwardable = True
+    return command
+
+
+def deferred_setup(command):
+    """Mark a command that sets up the client itself, only if it needs it."""
+    command.deferred_setup = True
+    return command
+
+
+def _leaf_command(ctx):
+    """Return the command invoked below the groups."""
+    command, args = ctx.meta["timedctl.subcommand"]
+    args = list(args)
+    while isinstance(command, click.Group) and args:
+        command = command.get_command(ctx, args.pop(0))
+    return command
+
+
+def _shows_help(ctx):
+    """Check whether the invoked command line only prints a help page."""
+    command, args = ctx.meta.get("timedctl.subcommand", (None, []))
+    args = list(args)
+    if any(arg in ctx.help_option_names for arg in args):
+        return True
+    # groups without a subcommand print their help
+    while isinstance(command, click.Group):
+        if not args:
+            return True
+        command = command.get_command(ctx, args.pop(0))
+    return False
+
+
+def _forward(ctx, custom_config):
+    """Run the invoked command in the daemon, if it is running and may."""
+    from timedctl.daemon import forward
+
+    if not getattr(_leaf_command(ctx), "forwardable", False):
+        return None
+    command, args = ctx.meta["timedctl.subcommand"]
+    return forward(
+        {
+            "args": [command.name, *args],
+            "config": custom_config,
+            "tty": sys.stdout.isatty(),
+            "columns": shutil.get_terminal_size().columns,
+        }
+    )
+
+
+@click.group(cls=TimedctlGroup)
 @click.option("--no-renew-token", default=False, is_flag=True)
 @click.option("--config", "custom_config", default=None, type=str)
+@click.option(
+    "--profile",
+    default=False,
+    is_flag=True,
+    envvar="TIMEDCTL_PROFILE",
+    help="Print where the time went.",
+)
+@click.option(
+    "--profile-output",
+    default=None,
+    type=click.Path(dir_okay=False, writable=True),
+    envvar="TIMEDCTL_PROFILE_OUTPUT",
+    help="Write a Chrome trace (.json) or cProfile dump (other names).",
+)
+@click.option(
+    "--trace-http",
+    default=False,
+    is_flag=True,
+    envvar="TIMEDCTL_TRACE_HTTP",
+    help="Print every HTTP request as it finishes.",
+)
 @click.version_option(package_name="timedctl")
-def timedctl(no_renew_token, custom_config):
+@click.pass_context
+def timedctl(  # noqa: PLR0913
+    ctx, no_renew_token, custom_config, profile, profile_output, trace_http
+):
     """Use timedctl."""
-    timed.load_config(custom_config)
-    timed.setup(no_renew_token)
+    if ctx.resilient_parsing or _shows_help(ctx):
+        return
+    timed.profile = Profile(profile, profile_output, trace_http)
+    if timed.profile.active:
+        timed.profile.watch_console(rich.get_console())
+    ctx.call_on_close(timed.close)
+    with timed.profile.phase("forward"):
+        response = _forward(ctx, custom_config)
+    if response:
+        sys.stdout.write(response["stdout"])
+        sys.stderr.write(response["stderr"])
+        ctx.exit(response["exit_code"])
+    with timed.profile.phase("config"):
+        timed.load_config(custom_config)
+    timed.no_renew_token = no_renew_token
+    if not getattr(_leaf_command(ctx), "deferred_setup", False):
+        with timed.profile.phase("setup"):
+            timed.setup(no_renew_token)
+    timed.profile.begin("command")
 
 
 @timedctl.command("force-renew")
@@ -26,6 +148,59 @@ def force_renew():
     timed.force_renew()
 
 
+@timedctl.command("daemon")
+@click.pass_context
+def daemon(ctx):
+    """Serve commands from a long running instance."""
+    from timedctl.daemon import run_command, serve, socket_path
+
+    custom_config = ctx.find_root().params["custom_config"]
+
+    def handle_command(request):
+        if request["config"] != custom_config:
+            return {"exit_code": None}
+        return run_command(timedctl, request, timed.refresh)
+
+    def sync_journal():
+        if len(timed.journal):
+            request = {"args": ["sync"], "tty": False, "columns": 80}
+            response = run_command(timedctl, request, timed.refresh)
+            if response["exit_code"] == 0:
+                sys.stdout.write(response["stdout"])
+
+    if not (path := socket_path()):
+        error_handler("ERR_NO_RUNTIME_DIR")
+    msg(f"Listening on {path}")
+    serve(path, handle_command, sync_journal)
+
+
+@timedctl.command("sync")
+@click.option("--discard-conflicts", default=False, is_flag=True)
+@click.option("--dry-run", default=False, is_flag=True)
+def sync(**kwargs):
+    """Send the writes queued while timed was unreachable."""
+    timed.sync_journal(**kwargs)
+
+
+@timedctl.group(cls=ClickAliasedGroup)
+def cache():
+    """Manage the local cache."""
+
+
+@deferred_setup
+@cache.command("clear")
+def clear_cache():
+    """Clear the cached customers, projects and tasks."""
+    timed.clear_cache()
+
+
+@deferred_setup
+@cache.command("stats")
+def cache_stats():
+    """Show how many prefetched requests were used."""
+    timed.cache_stats()
+
+
 @timedctl.group(cls=ClickAliasedGroup, aliases=["g", "show", "describe"])
 def get():
     """Get different things."""
@@ -36,24 +211,26 @@ def data():
     """Get raw data for building custom scripts."""
 
 
+@forwardable
 @data.command("customers")
 @click.option(
     "--format",
     "output_format",
     default="json",
-    type=click.Choice(["json", "csv", "text"]),
+    type=click.Choice(["json", "ndjson", "csv", "text"]),
 )
 def get_customers(**kwargs):
     """Get customers."""
     timed.get_customers(**kwargs)
 
 
+@forwardable
 @data.command("projects")
 @click.option(
     "--format",
     "output_format",
     default="json",
-    type=click.Choice(["json", "csv", "text"]),
+    type=click.Choice(["json", "ndjson", "csv", "text"]),
 )
 @click.option("--customer-id", default=None, type=int)
 @click.option("--customer-name", default=None, type=str)
@@ -63,12 +240,13 @@ def get_projects(**kwargs):
     timed.get_projects(**kwargs)
 
 
+@forwardable
 @data.command("tasks")
 @click.option(
     "--format",
     "output_format",
     default="json",
-    type=click.Choice(["json", "csv", "text"]),
+    type=click.Choice(["json", "ndjson", "csv", "text"]),
 )
 @click.option("--customer-id", default=None, type=int)
 @click.option("--customer-name", default=None, type=str)
@@ -82,6 +260,7 @@ def get_tasks(
     timed.get_tasks(**kwargs)
 
 
+@forwardable
 @get.command("overtime", aliases=["t", "ot", "undertime"])
 @click.option("--date", default=None)
 def get_overtime(**kwargs):
@@ -89,20 +268,48 @@ def get_overtime(**kwargs):
     timed.get_overtime(**kwargs)
 
 
+@forwardable
 @get.command("reports", aliases=["report", "r"])
-@click.option("--date", default=None)
+@date_range_options
 def get_reports(**kwargs):
     """Get reports."""
     timed.get_reports(**kwargs)
 
 
+@forwardable
 @get.command("activities", aliases=["a", "ac", "activity"])
-@click.option("--date", default=None)
+@date_range_options
 def get_activities(**kwargs):
     """Get activities."""
     timed.get_activities(**kwargs)
 
 
+@forwardable
+@timedctl.command("stats")
+@date_range_options
+@click.option(
+    "--by",
+    default=(),
+    multiple=True,
+    type=click.Choice(["customer", "project", "task", "weekday", "week"]),
+)
+@click.option(
+    "--pivot",
+    "pivot_by",
+    default=None,
+    type=click.Choice(["customer", "project", "task", "weekday", "week"]),
+)
+@click.option(
+    "--format",
+    "output_format",
+    default="table",
+    type=click.Choice(["table", "csv"]),
+)
+def stats(**kwargs):
+    """Sum up the reports of a range of dates."""
+    timed.stats(**kwargs)
+
+
 @get.command("absences", aliases=["abs"])
 def get_absences():
     """Get absences."""
@@ -115,7 +322,7 @@ def delete():
 
 
 @delete.command("report", aliases=["r"])
-@click.option("--date", default=None)
+@date_range_options
 def delete_report(**kwargs):
     """Delete report(s)."""
     timed.delete_report(**kwargs)
@@ -150,6 +357,23 @@ def add_report(**kwargs):
     timed.add_report(**kwargs)
 
 
+@add.command("reports", aliases=["rs"])
+@click.option(
+    "--from-file", "file", type=click.File(encoding="utf-8-sig"), required=True
+)
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(["csv", "ndjson"]),
+    default=None,
+    help="Format of the file, guessed from its name by default.",
+)
+@click.option("--show-archived", default=False, is_flag=True)
+def import_reports(**kwargs):
+    """Add the reports listed in a CSV or NDJSON file."""
+    timed.import_reports(**kwargs)
+
+
 @add.command("holiday", aliases=["h"])
 def add_holiday():
     """Add holiday(s)."""
@@ -168,7 +392,7 @@ def edit():
 
 
 @edit.command("report", aliases=["r"])
-@click.option("--date", default=None)
+@date_range_options
 def edit_report(**kwargs):
     """Edit report(s)."""
     timed.edit_report(**kwargs)
@@ -203,19 +427,31 @@ def start_activity(**kwargs):
     timed.start_activity(**kwargs)
 
 
+@forwardable
 @activity.command("stop", aliases=["end", "finish"])
 def stop_activity(**kwargs):
     """Stop current activity."""
     timed.stop_activity(**kwargs)
 
 
+@forwardable
+@deferred_setup
 @activity.command("show", aliases=["s", "get", "info"])
 @click.option("--short", default=False, is_flag=True)
+@click.option("--format", "template", default=None)
 def show_activity(**kwargs):
     """Show current activity."""
     timed.show_activity(**kwargs)
 
 
+@activity.command("watch", aliases=["w"])
+@click.option("--stream", default=False, is_flag=True, help="Print NDJSON lines.")
+@click.option("--format", "template", default=None)
+def watch_activity(**kwargs):
+    """Show the current activity until interrupted."""
+    timed.watch_activity(**kwargs)
+
+
 @activity.command("restart", aliases=["r", "continue", "resume"])
 @click.option("--date", default=None)
 def restart_activity(**kwargs):
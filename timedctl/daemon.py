@@ -0,0 +1,139 @@
+"""
+Serve commands from a long running timedctl over a Unix socket.
+"""
+
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import time
+import traceback
+
+import click
+import rich
+
+from timedctl.helpers import error_handler
+
+# seconds between the runs of the periodic task
+PERIODIC_INTERVAL = 60
+
+
+def socket_path():
+    """Return the path of the daemon socket, None without $XDG_RUNTIME_DIR."""
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if not runtime_dir:
+        return None
+    return os.path.join(runtime_dir, "timedctl.sock")
+
+
+def _connect(path):
+    """Connect to the daemon socket, return None if it is not running."""
+    if not (path and os.path.exists(path)):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def forward(request):
+    """Run a command in the daemon, return its response or None if not running."""
+    sock = _connect(socket_path())
+    if not sock:
+        return None
+    # the command might have run already, don't fall back to running it again
+    try:
+        with sock, sock.makefile("rwb") as file:
+            file.write(json.dumps(request).encode() + b"\n")
+            file.flush()
+            response = json.loads(file.readline())
+    except (OSError, ValueError):
+        error_handler("ERR_DAEMON_FAILED")
+    if response["exit_code"] is None:
+        # the daemon serves another configuration
+        return None
+    return response
+
+
+def run_command(group, request, prepare):
+    """Run a subcommand of a group without its callback, capturing the output."""
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    exit_code = 0
+    rich.reconfigure(force_terminal=request["tty"], width=request["columns"])
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        name, *args = request["args"]
+        command = group.get_command(click.Context(group), name)
+        try:
+            prepare()
+            command.main(args, prog_name=f"timedctl {name}", standalone_mode=False)
+        except click.ClickException as exc:
+            exc.show()
+            exit_code = exc.exit_code
+        except click.exceptions.Exit as exc:
+            exit_code = exc.exit_code
+        except SystemExit as exc:
+            exit_code = exc.code if isinstance(exc.code, int) else int(bool(exc.code))
+        except Exception:  # noqa: BLE001
+            # a failing command must not take down the daemon
+            traceback.print_exc()
+            exit_code = 1
+    return {
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "exit_code": exit_code,
+    }
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Handle a single command sent to the daemon."""
+
+    def handle(self):
+        """Run the command and send back its output and exit code."""
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        response = self.server.handle_command(request)
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class Server(socketserver.UnixStreamServer):
+    """Server running a periodic task between the commands."""
+
+    def __init__(self, path, handle_command, periodic):
+        super().__init__(path, RequestHandler)
+        self.handle_command = handle_command
+        self.periodic = periodic
+        self.last_run = time.monotonic()
+
+    def service_actions(self):
+        """Run the periodic task once it is due."""
+        if self.periodic and time.monotonic() - self.last_run > PERIODIC_INTERVAL:
+            self.periodic()
+            self.last_run = time.monotonic()
+
+
+def serve(path, handle_command, periodic=None):
+    """Serve commands on a Unix socket until interrupted."""
+    if sock := _connect(path):
+        sock.close()
+        error_handler("ERR_DAEMON_ALREADY_RUNNING")
+    # remove the socket of a daemon that didn't shut down cleanly
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+
+    # commands are run one at a time, they share the redirected output
+    with Server(path, handle_command, periodic) as server:
+        os.chmod(path, 0o600)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
@@ -2,13 +2,16 @@
 API unrelated helper functions.
 """
 
+import contextlib
+import csv
 import json
 import re
 import sys
-from datetime import timedelta
+import textwrap
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
 
 import click
-import pyfzf
 import rich
 
 
@@ -23,33 +26,55 @@ def error_handler(error):
     sys.exit(1)
 
 
+def _title(obj, title_key_array):
+    """Resolve the title of an object, . is the separator for the keys."""
+    if isinstance(title_key_array[0], int):
+        return obj[title_key_array[0]]
+    for key in title_key_array:
+        obj = obj[key]
+    return obj
+
+
 def fzf_wrapper(objects, title_key_array, prompt):
-    """Wrap pyfzf."""
-    # recursively resolve the title for each object
-    # . is separator for the keys.
-    titles = []
-    for obj in objects:
-        if isinstance(title_key_array[0], int):
-            title = obj[title_key_array[0]]
-        else:
-            title = obj
-            for key in title_key_array:
-                title = title[key]
-        titles.append(title)
-    # run the fzf prompt
-    result = [*pyfzf.FzfPrompt().prompt(titles, f"--prompt='{prompt}'"), None][0]
-    # turn the results back into objects
-    for obj in objects:
-        if isinstance(title_key_array[0], int):
-            title = obj[title_key_array[0]]
-        else:
-            title = obj
-            for key in title_key_array:
-                title = title[key]
-        if title == result:
-            return obj
-    error_handler("ERR_FZF_EXCEPTION")
-    return []
+    """Let the user pick an object with fzf.
+
+    The objects are streamed to fzf as they are produced, every line starts
+    with a hidden index mapping the selection back to its object.
+    """
+    import shutil
+    import subprocess
+
+    if not (executable := shutil.which("fzf")):
+        error_handler("ERR_FZF_NOT_FOUND")
+    command = [executable, f"--prompt={prompt}", "--delimiter=\t", "--with-nth=2.."]
+    process = subprocess.Popen(
+        command,  # noqa: S603
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        encoding="utf-8",
+        # send every line right away, the objects might be fetched slowly
+        bufsize=1,
+    )
+    listed = []
+    try:
+        # fzf closes its input once the user picked an object
+        with contextlib.suppress(BrokenPipeError):
+            for obj in objects:
+                title = " ".join(str(_title(obj, title_key_array)).splitlines())
+                process.stdin.write(f"{len(listed)}\t{title}\n")
+                listed.append(obj)
+    except BaseException:
+        # fzf keeps the terminal until it is stopped, even without input
+        process.terminate()
+        process.wait()
+        raise
+    with contextlib.suppress(BrokenPipeError):
+        process.stdin.close()
+    result = process.stdout.read()
+    process.wait()
+    if not result:
+        error_handler("ERR_FZF_EXCEPTION")
+    return listed[int(result.partition("\t")[0])]
 
 
 def time_picker(default=None):
@@ -61,6 +86,37 @@ def time_picker(default=None):
     return res
 
 
+def date_range(day=None, from_date=None, to_date=None, week=False, month=False):
+    """Return the first and last day selected by the date options."""
+    explicit_range = bool(from_date or to_date)
+    if sum([explicit_range, week, month]) > 1 or (day and explicit_range):
+        error_handler("ERR_CONFLICTING_DATE_OPTIONS")
+    try:
+        start = end = date.fromisoformat(day) if day else date.today()
+        if from_date or to_date:
+            start = date.fromisoformat(from_date or to_date)
+            end = date.fromisoformat(to_date) if to_date else date.today()
+    except ValueError:
+        error_handler("ERR_INVALID_DATE")
+    if week:
+        start -= timedelta(days=start.weekday())
+        end = start + timedelta(days=6)
+    elif month:
+        start = start.replace(day=1)
+        end = (start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+    if start > end:
+        error_handler("ERR_INVALID_DATE_RANGE")
+    return start, end
+
+
+def split_range(start, end, days):
+    """Split a range of dates into windows of up to a number of days."""
+    while start <= end:
+        window_end = min(start + timedelta(days=days - 1), end)
+        yield start, window_end
+        start = window_end + timedelta(days=1)
+
+
 def time_sum(arr):
     """Sum up an array of time strings."""
     total = timedelta()
@@ -71,21 +127,115 @@ def time_sum(arr):
     return str(total)
 
 
+def _total_rows(columns, total, total_column):
+    """Return the total row, if there is a column for it."""
+    if total_column is None:
+        return []
+    return [[str(total) if i == total_column else "" for i in range(len(columns))]]
+
+
+def _print_lines(columns, rows, title, total_column):
+    """Print every row as a tab separated line as soon as it is produced."""
+    out = sys.stdout
+    out.write(f"{title}\n" + "\t".join(columns) + "\n")
+    total = timedelta()
+    for cells, duration in rows:
+        total += duration
+        out.write("\t".join(cells) + "\n")
+        out.flush()
+    for cells in _total_rows(columns, total, total_column):
+        out.write("\t".join(cells) + "\n")
+    return total
+
+
+def _print_live(console, columns, rows, title, total_column):
+    """Show the latest rows live, then print the complete table."""
+    from rich.live import Live
+    from rich.table import Table
+
+    total = timedelta()
+    collected = []
+
+    def table(tail=None):
+        table = Table(*columns, title=title, title_style="bold", show_lines=True)
+        for cells in collected[-tail:] if tail else collected:
+            table.add_row(*cells)
+        for cells in _total_rows(columns, total, total_column):
+            table.add_row(*cells)
+        if tail and total_column is None:
+            table.caption = f"Total: {total}"
+        return table
+
+    def latest():
+        # the title, the header, the total and the borders take some lines
+        return table(max(1, (console.height - 8) // 2))
+
+    with Live(console=console, transient=True, get_renderable=latest):
+        for cells, duration in rows:
+            total += duration
+            collected.append(cells)
+    console.print(table())
+    return total
+
+
+def print_table(columns, rows, title, total_column=None):
+    """Print the rows of a table as they are produced.
+
+    rows yields (cells, duration) pairs, the durations are summed up and the
+    total is returned, shown in a last row under total_column if given. On a
+    terminal the latest rows are shown live until the table is complete,
+    otherwise every row is printed as a tab separated line right away.
+    """
+    console = rich.get_console()
+    if console.is_terminal:
+        return _print_live(console, columns, rows, title, total_column)
+    return _print_lines(columns, rows, title, total_column)
+
+
+def run_concurrently(func, items, max_workers):
+    """Call a function for all items in a thread pool.
+
+    Yields (item, result, exception) tuples in the order the calls finish.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(func, item): item for item in items}
+        for future in as_completed(futures):
+            error = future.exception()
+            yield futures[future], None if error else future.result(), error
+
+
 def output_formatted(data, output_format):
-    """Output data in a specified format."""
+    """Output data in a specified format.
+
+    The data can be any iterable of dicts, rows are written as they are
+    consumed. Only JSON for a terminal is collected and highlighted by rich.
+    """
+    out = sys.stdout
     match output_format:
         case "json":
-            rich.print(json.dumps(data, indent=4))
+            if out.isatty():
+                rich.print_json(data=list(data), indent=4)
+                return
+            separator = "[\n"
+            for obj in data:
+                out.write(
+                    separator + textwrap.indent(json.dumps(obj, indent=4), " " * 4)
+                )
+                separator = ",\n"
+            out.write("[]\n" if separator == "[\n" else "\n]\n")
+        case "ndjson":
+            for obj in data:
+                out.write(json.dumps(obj) + "\n")
         case "csv":
-            keys = data[0].keys()
-            output = ",".join(keys) + "\n"
+            writer = None
             for obj in data:
-                output += ",".join(obj.values()) + "\n"
-            rich.print(output)
+                if writer is None:
+                    writer = csv.DictWriter(out, list(obj), lineterminator="\n")
+                    writer.writeheader()
+                writer.writerow(obj)
         case "text":
             for obj in data:
-                for key, val in obj.items():
-                    rich.print(f"[{key}]: {val}, ", end="")
-                rich.print("")
+                out.write("".join(f"[{key}]: {val}, " for key, val in obj.items()))
+                out.write("\n")
         case _:
             rich.print("Invalid format")
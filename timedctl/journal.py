@@ -0,0 +1,76 @@
+"""
+Journal of the writes queued while timed is unreachable.
+"""
+
+import contextlib
+import fcntl
+import json
+import os
+import tempfile
+
+from timedctl.cache import user_namespace
+
+
+def state_home():
+    """Return the timedctl state directory based on $XDG_STATE_HOME."""
+    if not os.getenv("HOME"):
+        raise OSError("$HOME is not set")
+
+    xdg_state_home = os.getenv(
+        "XDG_STATE_HOME",
+        os.path.join(os.getenv("HOME"), ".local", "state"),
+    )
+    return os.path.join(xdg_state_home, "timedctl")
+
+
+class Journal:
+    """File of pending writes, appended to and replayed in order."""
+
+    def __init__(self, path):
+        self.path = path
+
+    @classmethod
+    def for_user(cls, timed_url, username):
+        """Return the journal of a user on a Timed instance."""
+        directory = os.path.join(state_home(), user_namespace(timed_url, username))
+        return cls(os.path.join(directory, "journal.ndjson"))
+
+    @contextlib.contextmanager
+    def _locked(self, suffix=".lock", blocking=True):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + suffix, "w") as lock:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            fcntl.flock(lock, flags)
+            yield
+
+    def entries(self):
+        """Return the pending writes, oldest first."""
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                return [json.loads(line) for line in file if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def __len__(self):
+        return len(self.entries())
+
+    def append(self, operation):
+        """Queue a write."""
+        with self._locked(), open(self.path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(operation) + "\n")
+
+    def remove(self, count):
+        """Remove the oldest writes once they are replayed."""
+        if not count:
+            return
+        with self._locked():
+            # writes might have been appended during the replay
+            remaining = self.entries()[count:]
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path))
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                file.writelines(json.dumps(entry) + "\n" for entry in remaining)
+            os.replace(tmp_path, self.path)
+
+    def replaying(self):
+        """Lock the journal for a replay, raise BlockingIOError if one runs."""
+        return self._locked(".replay.lock", blocking=False)
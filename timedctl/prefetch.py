@@ -0,0 +1,68 @@
+"""
+Speculative requests made while the user is busy with a prompt.
+"""
+
+import contextlib
+
+# number of recently selected tasks listed first in the task prompt
+HISTORY_SIZE = 20
+
+
+class Prefetcher:
+    """Start likely next requests early and count how many were used."""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.futures = {}
+        self.prefetched = 0
+        self.hits = 0
+        self.misses = 0
+
+    def start(self, key, func):
+        """Start a request in the background unless it is running already."""
+        if key not in self.futures:
+            self.futures[key] = self.executor.submit(func)
+            self.prefetched += 1
+
+    def get(self, key, func):
+        """Return the result of a prefetched request, or make the request now."""
+        if future := self.futures.pop(key, None):
+            # a failed request fails again below, unless it was a fluke
+            with contextlib.suppress(Exception):
+                result = future.result()
+                self.hits += 1
+                return result
+        # only count requests that could have been made during a prompt
+        if self.prefetched:
+            self.misses += 1
+        return func()
+
+    def stats(self):
+        """Return the counters of this invocation."""
+        return {
+            "prefetched": self.prefetched,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def add_stats(total, stats):
+    """Add the counters of an invocation to the totals of earlier ones."""
+    return {key: total.get(key, 0) + value for key, value in stats.items()}
+
+
+def hit_rate(stats):
+    """Return the share of the prefetched requests that were used."""
+    return stats["hits"] / stats["prefetched"] if stats.get("prefetched") else 0.0
+
+
+def remember(history, task_id):
+    """Move a task to the front of the recently selected tasks."""
+    return [task_id, *(entry for entry in history if entry != task_id)][:HISTORY_SIZE]
+
+
+def by_recency(entries, history):
+    """Order task index entries with the recently selected ones first."""
+    rank = {task_id: position for position, task_id in enumerate(history)}
+    # sorting is stable, the other tasks keep their order
+    return sorted(entries, key=lambda entry: rank.get(entry["id"], len(rank)))
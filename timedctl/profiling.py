@@ -0,0 +1,141 @@
+"""
+Timing of the phases of an invocation and of its HTTP requests.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+
+import click
+
+
+class Profile:
+    """Phases and HTTP requests of an invocation, for --profile and --trace-http.
+
+    An output file ending in .json gets a Chrome trace, any other a cProfile
+    dump of the main thread.
+    """
+
+    def __init__(self, report=False, output=None, trace_http=False):
+        self.report = report
+        self.output = output
+        self.trace_http = trace_http
+        self.active = bool(report or output or trace_http)
+        self.origin = time.perf_counter()
+        self.events = []
+        self.started = {}
+        self.profiler = None
+        if output and not output.endswith(".json"):
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def _record(self, category, name, start, end, **args):
+        self.events.append(
+            {
+                "cat": category,
+                "name": name,
+                "start": start - self.origin,
+                "duration": end - start,
+                "thread": threading.get_ident(),
+                "args": args,
+            }
+        )
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Record the time spent in a block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record("phase", name, start, time.perf_counter())
+
+    def begin(self, name):
+        """Start a phase ended by finish."""
+        self.started[name] = time.perf_counter()
+
+    def watch_console(self, console):
+        """Record the time spent printing to a rich console as rendering."""
+        console_print = console.print
+
+        def timed_print(*args, **kwargs):
+            with self.phase("rendering"):
+                console_print(*args, **kwargs)
+
+        console.print = timed_print
+
+    def response_hook(self, response, *args, **kwargs):
+        """Record a finished HTTP request, hooked into a requests session."""
+        received = time.perf_counter()
+        size = 0 if kwargs.get("stream") else len(response.content)
+        end = time.perf_counter()
+        start = received - response.elapsed.total_seconds()
+        name = f"{response.request.method} {response.url}"
+        self._record("http", name, start, end, status=response.status_code, bytes=size)
+        if self.trace_http:
+            click.echo(self._request_line(self.events[-1]), err=True)
+
+    def _request_line(self, event):
+        args = event["args"]
+        return (
+            f"{args['status']} {event['name']} "
+            f"{args['bytes']} B {event['duration'] * 1000:.1f} ms"
+        )
+
+    def finish(self, session=None):
+        """End the open phases and write the report and the output file."""
+        end = time.perf_counter()
+        for name, start in self.started.items():
+            self._record("phase", name, start, end)
+        self.started = {}
+        if self.profiler:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.output)
+        elif self.output:
+            self._write_trace()
+        if self.report:
+            self._print_report(end - self.origin, session)
+
+    def _print_report(self, total, session):
+        phases = {}
+        for event in sorted(self.events, key=lambda event: event["start"]):
+            if event["cat"] == "phase":
+                count, duration = phases.get(event["name"], (0, 0))
+                phases[event["name"]] = (count + 1, duration + event["duration"])
+        click.echo("Phases:", err=True)
+        for name, (count, duration) in phases.items():
+            label = f"{name} ({count}x)" if count > 1 else name
+            click.echo(f"  {label:<24}{duration * 1000:>10.1f} ms", err=True)
+        requests = [event for event in self.events if event["cat"] == "http"]
+        if requests:
+            click.echo("HTTP requests:", err=True)
+            for event in sorted(requests, key=lambda event: event["start"]):
+                click.echo(f"  {self._request_line(event)}", err=True)
+        if session is not None:
+            from timedctl.session import connections_opened
+
+            click.echo(f"Connections opened: {connections_opened(session)}", err=True)
+        click.echo(f"Total: {total * 1000:.1f} ms", err=True)
+
+    def _write_trace(self):
+        """Write the events in the Chrome trace format, e.g. for Perfetto."""
+        pid = os.getpid()
+        trace = [
+            {
+                "name": event["name"],
+                "cat": event["cat"],
+                "ph": "X",
+                "ts": event["start"] * 1_000_000,
+                "dur": event["duration"] * 1_000_000,
+                "pid": pid,
+                "tid": event["thread"],
+                "args": event["args"],
+            }
+            for event in self.events
+        ]
+        with open(self.output, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": trace}, file)
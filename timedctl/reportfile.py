@@ -0,0 +1,92 @@
+"""
+Reports to import from CSV or NDJSON files.
+"""
+
+import csv
+import json
+from datetime import date, timedelta
+
+from timedctl.timesheet import parse_duration
+
+
+class RowError(ValueError):
+    """A row of a report file is invalid."""
+
+
+class UnknownTaskError(RowError):
+    """The task of a row is not in the task index."""
+
+
+def file_format(name):
+    """Guess the format of a report file from its name."""
+    return "ndjson" if name.endswith((".ndjson", ".jsonl")) else "csv"
+
+
+def read_rows(file, fmt):
+    """Yield the line numbers and rows of a report file as they are read.
+
+    Lines of an NDJSON file that aren't valid JSON yield None as their row.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError:
+            yield number, None
+
+
+def _task_id(row, index):
+    """Resolve the task of a row by id or by customer, project and task name."""
+    if row.get("task_id"):
+        task_id = str(row["task_id"])
+        if not index.path(task_id):
+            raise UnknownTaskError(f"unknown task id {task_id}")
+        return task_id
+    names = [row.get(key) for key in ("customer", "project", "task")]
+    if not all(names):
+        raise RowError("either task_id or customer, project and task are required")
+    customer, project, task = names
+    task_id = index.task_id(
+        index.project_id(index.customer_id(customer), project), task
+    )
+    if not task_id:
+        raise UnknownTaskError(f"unknown task {customer} > {project} > {task}")
+    return task_id
+
+
+def parse_row(row, index):
+    """Return the report of a row, its task resolved through the task index.
+
+    Raises RowError describing the first problem of the row.
+    """
+    if not isinstance(row, dict):
+        raise RowError("not a JSON object")
+    try:
+        day = date.fromisoformat(str(row.get("date") or ""))
+    except ValueError:
+        raise RowError(f"invalid date {row.get('date')!r}") from None
+    try:
+        duration = parse_duration(str(row.get("duration") or ""))
+    except ValueError:
+        raise RowError(f"invalid duration {row.get('duration')!r}") from None
+    if duration <= timedelta(0):
+        raise RowError(f"duration {row.get('duration')!r} isn't positive")
+    if not row.get("comment"):
+        raise RowError("comment is required")
+    return {
+        "date": day,
+        "task": _task_id(row, index),
+        "comment": row["comment"],
+        "duration": duration,
+    }
+
+
+def report_key(report):
+    """Return what makes two reports duplicates of each other."""
+    return (report["date"], report["task"], report["comment"], report["duration"])
@@ -0,0 +1,25 @@
+"""
+Resolve relationships from the resources included in JSON:API responses.
+"""
+
+
+def relationship_id(relationship):
+    """Return the id of a relationship, whether libtimed resolved it or not."""
+    if not relationship:
+        return None
+    if "data" in relationship:
+        return (relationship["data"] or {}).get("id")
+    return relationship.get("id")
+
+
+class IncludedResolver:
+    """Index of the included resources of a response by type and id."""
+
+    def __init__(self, response):
+        self.index = {
+            (item["type"], item["id"]): item for item in response.get("included", [])
+        }
+
+    def resolve(self, resource_type, relationship):
+        """Return the included resource a relationship points to, if any."""
+        return self.index.get((resource_type, relationship_id(relationship)))
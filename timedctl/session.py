@@ -0,0 +1,106 @@
+"""
+Shared HTTP session with connection pooling and retries.
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+from urllib3.util.retry import Retry
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 3
+# seconds to wait before the first retry, doubled for every further retry
+DEFAULT_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class PooledAdapter(HTTPAdapter):
+    """Adapter with a default timeout, counting the connections it opens."""
+
+    def __init__(self, pool_size, retries, backoff, timeout):
+        self.timeout = timeout
+        self.connections = 0
+        self.lock = threading.Lock()
+        # only idempotent requests are retried, writes retry on their own;
+        # failed connects aren't, writes are queued after one connect timeout
+        max_retries = Retry(
+            total=retries,
+            connect=0,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            raise_on_status=False,
+        )
+        super().__init__(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=max_retries,
+        )
+
+    def init_poolmanager(self, *args, **kwargs):
+        """Create the pool manager with connection counting pools."""
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": self._counting(HTTPConnectionPool),
+            "https": self._counting(HTTPSConnectionPool),
+        }
+
+    def _counting(self, pool_class):
+        adapter = self
+
+        class CountingConnectionPool(pool_class):
+            def _new_conn(self):
+                with adapter.lock:
+                    adapter.connections += 1
+                return super()._new_conn()
+
+        return CountingConnectionPool
+
+    def send(self, request, timeout=None, **kwargs):
+        """Send a request, with the default timeout unless one is given."""
+        return super().send(request, timeout=timeout or self.timeout, **kwargs)
+
+
+class TimedAuth(requests.auth.AuthBase):
+    """Authenticate requests to the Timed API, leaving other hosts alone."""
+
+    def __init__(self, token, url):
+        self.token = token
+        self.url = url
+
+    def __call__(self, request):
+        """Add the headers of the Timed API to a request."""
+        if request.url.startswith(self.url):
+            request.headers["Authorization"] = f"Bearer {self.token}"
+            request.headers["Content-Type"] = "application/vnd.api+json"
+        return request
+
+
+def create_session(pool_size, retries, timeout, backoff=DEFAULT_BACKOFF):
+    """Create a session sharing one pool of keep-alive connections."""
+    session = requests.Session()
+    adapter = PooledAdapter(pool_size, retries, backoff, timeout)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def not_sent(exc):
+    """Check whether a failed request can't have reached the server."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    # connection errors wrap the MaxRetryError of urllib3
+    reason = exc.args[0] if exc.args else None
+    return isinstance(getattr(reason, "reason", reason), NewConnectionError)
+
+
+def connections_opened(session):
+    """Return the number of connections a session opened so far."""
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    return sum(
+        adapter.connections
+        for adapter in adapters.values()
+        if isinstance(adapter, PooledAdapter)
+    )
@@ -0,0 +1,124 @@
+"""
+Rollups of reports over a range of dates, from reports held in columns.
+"""
+
+from array import array
+from collections import defaultdict
+from datetime import date
+
+from timedctl.resolver import relationship_id
+
+DIMENSIONS = ("customer", "project", "task", "weekday", "week")
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+UNKNOWN_TASK = ("Unknown customer", "Unknown project", "Unknown task")
+
+
+class ReportColumns:
+    """Durations in seconds, task ids and ordinal dates of reports."""
+
+    def __init__(self):
+        self.durations = array("q")
+        self.tasks = array("q")
+        self.dates = array("l")
+
+    def __len__(self):
+        return len(self.durations)
+
+    def extend(self, reports):
+        """Add deserialized reports."""
+        for report in reports:
+            attributes = report["attributes"]
+            self.durations.append(int(attributes["duration"].total_seconds()))
+            self.tasks.append(int(relationship_id(report["relationships"]["task"])))
+            self.dates.append(attributes["date"].toordinal())
+
+    def task_ids(self):
+        """Return the distinct task ids."""
+        return set(self.tasks)
+
+
+def format_duration(seconds):
+    """Format seconds as hours, minutes and seconds, also beyond a day."""
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02}:{seconds % 60:02}"
+
+
+def _date_keys(ordinal):
+    day = date.fromordinal(ordinal)
+    year, week, _ = day.isocalendar()
+    return WEEKDAYS[day.weekday()], f"{year}-W{week:02}"
+
+
+def _task_keys(names):
+    customer, project, task = names
+    return customer, f"{customer} > {project}", f"{customer} > {project} > {task}"
+
+
+def dimension_keys(columns, names):
+    """Return the dimension keys of the distinct tasks and dates of the rows.
+
+    names maps the task ids to their customer, project and task names.
+    """
+    tasks = {
+        task_id: _task_keys(names.get(task_id, UNKNOWN_TASK))
+        for task_id in columns.task_ids()
+    }
+    dates = {ordinal: _date_keys(ordinal) for ordinal in set(columns.dates)}
+    return tasks, dates
+
+
+def rollups(columns, names):
+    """Sum the durations by every dimension in a single pass over the rows."""
+    sums = {dimension: defaultdict(int) for dimension in DIMENSIONS}
+    customers, projects, tasks = sums["customer"], sums["project"], sums["task"]
+    weekdays, weeks = sums["weekday"], sums["week"]
+    task_keys, date_keys = dimension_keys(columns, names)
+    for duration, task_id, ordinal in zip(
+        columns.durations, columns.tasks, columns.dates, strict=True
+    ):
+        customer, project, task = task_keys[task_id]
+        weekday, week = date_keys[ordinal]
+        customers[customer] += duration
+        projects[project] += duration
+        tasks[task] += duration
+        weekdays[weekday] += duration
+        weeks[week] += duration
+    return {dimension: _ordered(dimension, sums[dimension]) for dimension in sums}
+
+
+def pivot(columns, names, rows, cols):
+    """Sum the durations by a dimension for the rows and one for the columns.
+
+    Returns the column keys and the rows as (key, sums by column key).
+    """
+    task_keys, date_keys = dimension_keys(columns, names)
+    keys = {
+        "customer": lambda task_id, ordinal: task_keys[task_id][0],
+        "project": lambda task_id, ordinal: task_keys[task_id][1],
+        "task": lambda task_id, ordinal: task_keys[task_id][2],
+        "weekday": lambda task_id, ordinal: date_keys[ordinal][0],
+        "week": lambda task_id, ordinal: date_keys[ordinal][1],
+    }
+    row_key, col_key = keys[rows], keys[cols]
+    cells = defaultdict(lambda: defaultdict(int))
+    for duration, task_id, ordinal in zip(
+        columns.durations, columns.tasks, columns.dates, strict=True
+    ):
+        cells[row_key(task_id, ordinal)][col_key(task_id, ordinal)] += duration
+    totals = defaultdict(int)
+    for row in cells.values():
+        for key, duration in row.items():
+            totals[key] += duration
+    row_totals = {key: sum(row.values()) for key, row in cells.items()}
+    return (
+        list(_ordered(cols, totals)),
+        [(key, cells[key]) for key in _ordered(rows, row_totals)],
+    )
+
+
+def _ordered(dimension, sums):
+    """Order days of the week and weeks by time, the others by duration."""
+    if dimension == "weekday":
+        return {day: sums[day] for day in WEEKDAYS if day in sums}
+    if dimension == "week":
+        return dict(sorted(sums.items()))
+    return dict(sorted(sums.items(), key=lambda item: (-item[1], item[0])))
@@ -0,0 +1,160 @@
+"""
+Local SQLite mirror of the reports and activities of a user.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+
+from timedctl.cache import cache_home, user_namespace
+from timedctl.resolver import relationship_id
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    task TEXT,
+    comment TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (kind, id)
+);
+CREATE INDEX IF NOT EXISTS resources_date ON resources (kind, date);
+CREATE INDEX IF NOT EXISTS resources_task ON resources (kind, task);
+CREATE INDEX IF NOT EXISTS resources_comment ON resources (kind, comment);
+CREATE TABLE IF NOT EXISTS windows (
+    kind TEXT NOT NULL,
+    first TEXT NOT NULL,
+    last TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    synced REAL NOT NULL,
+    included TEXT NOT NULL,
+    PRIMARY KEY (kind, first, last)
+);
+"""
+
+
+class LocalStore:
+    """Reports and activities synced by windows of dates.
+
+    A window is replaced as a whole whenever the server sends it again, its
+    ETag and Last-Modified header make the next sync a conditional request.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # the windows are synced from the threads of the request pool
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.executescript(SCHEMA)
+
+    @classmethod
+    def for_user(cls, timed_url, username):
+        """Return the store of a user on a Timed instance."""
+        directory = os.path.join(cache_home(), user_namespace(timed_url, username))
+        return cls(os.path.join(directory, "store.sqlite3"))
+
+    def window(self, kind, first, last):
+        """Return the ETag, Last-Modified header and sync time of a window."""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT etag, last_modified, synced FROM windows"
+                " WHERE kind = ? AND first = ? AND last = ?",
+                (kind, first.isoformat(), last.isoformat()),
+            ).fetchone()
+
+    def fresh(self, kind, first, last, ttl):
+        """Check whether a window can be read without asking the server.
+
+        Windows reaching today are always synced, they still change.
+        """
+        window = self.window(kind, first, last)
+        return bool(window) and last < date.today() and window[2] > time.time() - ttl
+
+    def save(self, kind, first, last, response, etag=None, last_modified=None):
+        """Replace the resources of a window with the ones of a response."""
+        rows = [
+            (
+                kind,
+                item["id"],
+                item["attributes"]["date"],
+                relationship_id(item["relationships"].get("task")),
+                item["attributes"].get("comment"),
+                json.dumps(item),
+            )
+            for item in response["data"]
+        ]
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM resources WHERE kind = ? AND date BETWEEN ? AND ?",
+                (kind, first.isoformat(), last.isoformat()),
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO resources VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO windows VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    kind,
+                    first.isoformat(),
+                    last.isoformat(),
+                    etag,
+                    last_modified,
+                    time.time(),
+                    json.dumps(response.get("included", [])),
+                ),
+            )
+
+    def touch(self, kind, first, last):
+        """Mark a window the server confirmed unchanged as synced."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE windows SET synced = ? WHERE kind = ? AND first = ? AND last = ?",
+                (time.time(), kind, first.isoformat(), last.isoformat()),
+            )
+
+    def read(self, kind, first, last, start=None, end=None):
+        """Return a window as a response, only with the resources from start to end."""
+        start, end = start or first, end or last
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT data FROM resources WHERE kind = ? AND date BETWEEN ? AND ?"
+                " ORDER BY date, rowid",
+                (kind, start.isoformat(), end.isoformat()),
+            ).fetchall()
+            included = self.connection.execute(
+                "SELECT included FROM windows WHERE kind = ? AND first = ? AND last = ?",
+                (kind, first.isoformat(), last.isoformat()),
+            ).fetchone()
+        return {
+            "data": [json.loads(data) for (data,) in rows],
+            "included": json.loads(included[0]) if included else [],
+        }
+
+    def forget_date(self, kind, day):
+        """Sync the windows containing a date again, it changed."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM windows WHERE kind = ? AND ? BETWEEN first AND last",
+                (kind, day),
+            )
+
+    def forget(self, kind, id):  # noqa: A002
+        """Sync the windows containing a resource again, it changed."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT date FROM resources WHERE kind = ? AND id = ?", (kind, id)
+            ).fetchone()
+        if row:
+            self.forget_date(kind, row[0])
+
+    def clear(self):
+        """Remove all resources and windows."""
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM resources")
+            self.connection.execute("DELETE FROM windows")
@@ -0,0 +1,84 @@
+"""
+Flattened index of all customer > project > task paths.
+"""
+
+from timedctl.resolver import relationship_id
+
+
+def build_task_index(customers, projects, tasks):
+    """Build the cacheable index data from customers, projects and tasks."""
+    return {
+        "customers": [[c["id"], c["attributes"]["name"]] for c in customers],
+        "projects": [
+            [
+                p["id"],
+                relationship_id(p["relationships"]["customer"]),
+                p["attributes"]["name"],
+            ]
+            for p in projects
+        ],
+        "tasks": [
+            [
+                t["id"],
+                relationship_id(t["relationships"]["project"]),
+                t["attributes"]["name"],
+            ]
+            for t in tasks
+        ],
+    }
+
+
+class TaskIndex:
+    """Ids by name and the paths of all tasks."""
+
+    def __init__(self, data):
+        self.customers = {name: customer_id for customer_id, name in data["customers"]}
+        customer_names = dict(data["customers"])
+        self.projects = {}
+        project_names = {}
+        for project_id, customer_id, name in data["projects"]:
+            self.projects[(customer_id, name)] = project_id
+            project_names[project_id] = (customer_id, name)
+        self.tasks = {}
+        self.paths = {}
+        self.entries = []
+        for task_id, project_id, name in data["tasks"]:
+            self.tasks[(project_id, name)] = task_id
+            customer_id, project = project_names.get(project_id, (None, None))
+            # skip tasks whose project or customer is not part of the index
+            if customer_id not in customer_names:
+                continue
+            customer = customer_names[customer_id]
+            self.paths[task_id] = f"{customer} > {project} > {name}"
+            self.entries.append(
+                {
+                    "id": task_id,
+                    "path": self.paths[task_id],
+                    "names": (customer, project, name),
+                }
+            )
+
+    def customer_id(self, name):
+        """Return the id of a customer by name."""
+        return self.customers.get(name)
+
+    def project_id(self, customer_id, name):
+        """Return the id of a project of a customer by name."""
+        return self.projects.get((customer_id, name))
+
+    def task_id(self, project_id, name):
+        """Return the id of a task of a project by name."""
+        return self.tasks.get((project_id, name))
+
+    def path(self, task_id):
+        """Return the customer > project > task path of a task by id."""
+        return self.paths.get(task_id)
+
+    def find(self, customer=None, project=None, task=None):
+        """Return the entries of the tasks matching the given names."""
+        names = (customer, project, task)
+        return [
+            entry
+            for entry in self.entries
+            if all(name in (None, value) for name, value in zip(names, entry["names"]))
+        ]
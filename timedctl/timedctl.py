@@ -1,37 +1,96 @@
 #!/usr/bin/env python
 """CLI application for libtimed."""
 
+import contextlib
+import json
 import os
 import re
+import threading
 import time
-import webbrowser
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from http import HTTPStatus
+from urllib.parse import urlencode
 
 import click
-import jwt
-import keyring
-import pyfzf
-import requests
+import rich
 import tomllib
-from libtimed import TimedAPIClient
 from rich import print
-from rich.table import Table
-from tomlkit import dump
 
+from timedctl.cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL, Cache, max_age
 from timedctl.helpers import (
+    date_range,
     error_handler,
     fzf_wrapper,
     msg,
     output_formatted,
+    print_table,
+    run_concurrently,
+    split_range,
     time_picker,
 )
+from timedctl.journal import Journal
+from timedctl.prefetch import Prefetcher, add_stats, by_recency, hit_rate, remember
+from timedctl.profiling import Profile
+from timedctl.resolver import IncludedResolver, relationship_id
+from timedctl.taskindex import TaskIndex, build_task_index
+from timedctl.timesheet import ReportIndex, parse_duration, plan_timesheet
+from timedctl.tokens import remaining, token_bundle, token_store
 
 TIMEOUT = 30
+# seconds to wait for a connection, writes are queued if timed is unreachable
+CONNECT_TIMEOUT = 5
+# fallback lifetime of the OpenID configuration in seconds
+OPENID_CONFIGURATION_TTL = 60 * 60 * 24
+# minutes before expiry when the access token is refreshed in the background
+TOKEN_REFRESH_MARGIN = 5
+# seconds before expiry when tokens aren't used anymore
+ACCESS_TOKEN_LEEWAY = 30
+REFRESH_TOKEN_LEEWAY = 10
+# number of requests sent concurrently
+PARALLEL_REQUESTS = 4
+# seconds `activity show --short` trusts the current activity snapshot
+SNAPSHOT_CHECK_INTERVAL = 60
+# seconds `activity watch` waits between polls, doubled while nothing changes
+WATCH_INTERVAL = 5
+WATCH_MAX_INTERVAL = 60
+CURRENT_ACTIVITY_KEY = "current-activity"
+TASK_HISTORY_KEY = "task-history"
+PREFETCH_STATS_KEY = "prefetch-stats"
+# seconds the task history and the prefetch stats are kept
+HISTORY_TTL = 60 * 60 * 24 * 365
+# number of days fetched with a single reports request
+REPORTS_PAGE_DAYS = 7
+# the local store syncs everything any command includes
+LOCAL_STORE_INCLUDE = "task,task.project,task.project.customer"
+# seconds past windows of the local store are read without asking timed
+LOCAL_STORE_TTL = 60 * 60 * 24
+WRITE_RETRIES = 3
+# seconds to wait before the first retry, doubled for every further retry
+WRITE_BACKOFF = 0.5
+
+
+class WriteError(Exception):
+    """A write request to timed failed."""
+
+
+class ConflictError(Exception):
+    """A queued write doesn't fit the server state anymore."""
+
+
+class FetchError(Exception):
+    """A read request to timed failed."""
+
+
+class SSOError(Exception):
+    """The SSO can't serve a request."""
 
 
 class Timedctl:
     def __init__(self):
-        pass
+        self.timed = None
+        self.no_renew_token = False
+        self.tokens = {}
+        self.profile = Profile()
 
     def load_config(self, custom_config=None):
         """Load the timedctl config."""
@@ -58,6 +117,8 @@ class Timedctl:
             config_file = os.path.join(config_dir, "config.toml")
 
         if not os.path.isfile(config_file):
+            from tomlkit import dump
+
             os.makedirs(config_dir, exist_ok=True)
             click.echo("No config file found. Please enter the following infos.")
             for key in cfg:
@@ -80,63 +141,318 @@ class Timedctl:
                 del user_config["sso_url"]
                 del user_config["sso_realm"]
 
+                from tomlkit import dump
+
                 with open(config_file, "w", encoding="utf-8") as file:
                     dump(user_config, file)
 
             for key in user_config:
                 cfg[key] = user_config[key]
         self.config = cfg
+        self.cache = Cache.for_user(
+            self.config.get("timed_url"),
+            self.config["username"],
+            ttl=self.config.get("cache_ttl", DEFAULT_TTL),
+            max_entries=self.config.get("cache_max_entries", DEFAULT_MAX_ENTRIES),
+        )
+        self.journal = Journal.for_user(
+            self.config.get("timed_url"), self.config["username"]
+        )
+        self.token_store = token_store(
+            self.config.get("token_store", "keyring"), self.config["sso_client_id"]
+        )
+        self.store = None
+        if self.config.get("local_store", False):
+            from timedctl.store import LocalStore
+
+            self.store = LocalStore.for_user(
+                self.config.get("timed_url"), self.config["username"]
+            )
 
     def setup(self, no_renew_token=False):
         """Set up the timed client."""
+        from libtimed import TimedAPIClient
+
+        from timedctl.aio import AsyncTimed
+        from timedctl.session import (
+            DEFAULT_POOL_SIZE,
+            DEFAULT_RETRIES,
+            TimedAuth,
+            create_session,
+        )
+
+        # one pool of connections for the SSO and timed
+        self.session = create_session(
+            self.config.get("http_pool_size", DEFAULT_POOL_SIZE),
+            self.config.get("http_retries", DEFAULT_RETRIES),
+            (self.config.get("connect_timeout", CONNECT_TIMEOUT), TIMEOUT),
+        )
+        if self.profile.active:
+            self.session.hooks["response"].append(self.profile.response_hook)
+
         # initialize libtimed
         url = self.config.get("timed_url")
         api_namespace = "api/v1"
-        client_id = self.config["sso_client_id"]
+        # the tokens are bundled with their expiry, no need to decode them
+        with self.profile.phase("token store"):
+            self.tokens = self.token_store.load() or {}
+        if remaining(self.tokens, "access") > ACCESS_TOKEN_LEEWAY:
+            access_token = self.tokens["access"]
+            # refresh ahead of expiry so commands don't have to wait for it
+            margin = self.config.get("token_refresh_margin", TOKEN_REFRESH_MARGIN)
+            if remaining(self.tokens, "access") < margin * 60:
+                threading.Thread(target=self._refresh_in_background).start()
+        elif remaining(self.tokens, "refresh") > REFRESH_TOKEN_LEEWAY:
+            access_token = self.refresh_token(self.tokens["refresh"], no_renew_token)
+        else:
+            # tokens expired or missing
+            if no_renew_token:
+                error_handler("ERR_TOKEN_MISSING_OR_EXPIRED")
+            access_token = self.login()
 
-        access_token = keyring.get_password(
-            "system", "timedctl_token_" + client_id + "_access"
+        self.timed = TimedAPIClient(access_token, url, api_namespace)
+        self.session.auth = TimedAuth(access_token, self.timed.url)
+        self.timed.session = self.session
+        self.aio = AsyncTimed(
+            self.timed, self.config.get("parallel_requests", PARALLEL_REQUESTS)
         )
-        decode_options = {"verify_signature": False, "verify_exp": "verify_signature"}
+        self.prefetcher = Prefetcher(self.aio.executor)
+        # task indexes rebuilt during this invocation, by archived flag
+        self.task_indexes = {}
+
+    def ensure_setup(self):
+        """Set up the timed client for a command that deferred it."""
+        if self.timed is None:
+            self.setup(self.no_renew_token)
+
+    def refresh(self):
+        """Prepare a long running instance for its next command."""
+        self.task_indexes = {}
+        self.prefetcher = Prefetcher(self.aio.executor)
         try:
-            # Check if access_token is valid
-            jwt.decode(access_token, leeway=-30, options=decode_options)
-
-        except (jwt.exceptions.ExpiredSignatureError, jwt.exceptions.DecodeError):
-            # Access token expired or missing
-            refresh_token = keyring.get_password(
-                "system", "timedctl_token_" + client_id + "_refresh"
+            self._refresh_tokens()
+        except SSOError as exc:
+            error_handler(str(exc))
+
+    def _refresh_tokens(self):
+        """Use the latest tokens, refreshing the access token if it expires soon.
+
+        The tokens are kept in memory, the token store is only read again
+        once they expire soon. Raises SSOError if the access token can't be
+        refreshed.
+        """
+        margin = self.config.get("token_refresh_margin", TOKEN_REFRESH_MARGIN) * 60
+        if remaining(self.tokens, "access") < margin:
+            # other invocations might have refreshed the tokens
+            self._load_tokens()
+        if remaining(self.tokens, "access") < margin and not (
+            self._request_token_refresh(self.tokens["refresh"])
+        ):
+            # or rotated the refresh token in the meantime
+            self._load_tokens()
+            if remaining(self.tokens, "access") < margin:
+                raise SSOError("ERR_REFRESHING_TOKEN")
+        self.session.auth.token = self.tokens["access"]
+        self.timed.token = self.tokens["access"]
+
+    def _load_tokens(self):
+        """Replace the tokens in memory with the ones in the token store."""
+        with self.profile.phase("token store"):
+            self.tokens = self.token_store.load() or self.tokens
+
+    def _get_cached(self, model, filters=None, id=None, revalidate=False):  # noqa: A002
+        """Get resources of a model through the on-disk cache.
+
+        Raises FetchError if timed doesn't answer with the resources.
+        """
+        url = f"{model.url}/{id}" if id else model.url
+        params = {}
+        if not id:
+            # unset relationship filters serialize to dicts, drop them
+            params = {
+                key: value
+                for key, value in model._parse_filters(filters).items()
+                if not isinstance(value, dict)
+            }
+        key = f"{url}?{urlencode(sorted(params.items()))}"
+
+        entry = self.cache.get(key)
+        if revalidate or not (entry and self.cache.fresh(entry)):
+            headers = {}
+            if entry and entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry and entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+            res = self.timed.session.get(
+                url, params=params, headers=headers, timeout=TIMEOUT
             )
-            try:
-                jwt.decode(refresh_token, leeway=-10, options=decode_options)
-                access_token = self.refresh_token(refresh_token, no_renew_token)
-
-            except (jwt.exceptions.ExpiredSignatureError, jwt.exceptions.DecodeError):
-                # Refresh token expired or missing
-                if no_renew_token:
-                    error_handler("ERR_TOKEN_MISSING_OR_EXPIRED")
+            if entry and res.status_code == HTTPStatus.NOT_MODIFIED:
+                entry = self.cache.revalidated(entry)
+            elif res.status_code == HTTPStatus.OK:
+                entry = self.cache.set(
+                    key,
+                    res.json(),
+                    etag=res.headers.get("ETag"),
+                    last_modified=res.headers.get("Last-Modified"),
+                )
+            else:
+                raise FetchError("ERR_FETCHING_DATA_FAILED")
+
+        response = entry["data"]
+        data = [response["data"]] if id else response["data"]
+        for item in data:
+            model._deserialize(item, response.get("included", []))
+        return data[0] if id else data
+
+    def _get_raw(self, model, params, include=None):
+        """Get a response of a model without libtimed's default filters."""
+        res = self.timed.session.get(
+            model.url, params={**params, "include": include}, timeout=TIMEOUT
+        )
+        if res.status_code != HTTPStatus.OK:
+            error_handler("ERR_FETCHING_DATA_FAILED")
+        response = res.json()
+        for item in response["data"]:
+            model._deserialize(item, response.get("included", []))
+        return response
+
+    def _get_pages(self, model, pages, include=None):
+        """Fetch pages concurrently, yielding the responses in page order."""
+        yield from self.aio.executor.map(
+            lambda params: self._get_raw(model, params, include), pages
+        )
 
-                access_token = self.login()
+    def _get_reports(self, start, end, include):
+        """Yield the responses of the user's reports in a range of dates."""
+        user = self.timed.users.me["id"]
+        if self.store:
+            # whole weeks, so all ranges share the windows of the store
+            windows = [
+                (first, last, {"user": user, "from_date": first, "to_date": last})
+                for first, last in split_range(
+                    start - timedelta(days=start.weekday()),
+                    end + timedelta(days=6 - end.weekday()),
+                    REPORTS_PAGE_DAYS,
+                )
+            ]
+            return self._get_mirrored(self.timed.reports, windows, start, end)
+        pages = [
+            {"user": user, "from_date": first.isoformat(), "to_date": last.isoformat()}
+            for first, last in split_range(start, end, REPORTS_PAGE_DAYS)
+        ]
+        return self._get_pages(self.timed.reports, pages, include)
 
-        self.timed = TimedAPIClient(access_token, url, api_namespace)
+    def _get_activities(self, start, end, include):
+        """Yield the responses of the activities in a range of dates, by day."""
+        if self.store:
+            windows = [
+                (day, day, {"day": day}) for day, _ in split_range(start, end, 1)
+            ]
+            return self._get_mirrored(self.timed.activities, windows, start, end)
+        pages = [{"day": day.isoformat()} for day, _ in split_range(start, end, 1)]
+        return self._get_pages(self.timed.activities, pages, include)
+
+    def _get_mirrored(self, model, windows, start, end):
+        """Yield the responses of windows of dates from the local store.
+
+        Stale windows are synced concurrently first, the others are read
+        without a request.
+        """
+        ttl = self.config.get("local_store_ttl", LOCAL_STORE_TTL)
+        syncs = {
+            first: self.aio.executor.submit(
+                self._sync_window, model, first, last, params
+            )
+            for first, last, params in windows
+            if not self.store.fresh(model.resource_name, first, last, ttl)
+        }
+        for first, last, _ in windows:
+            if first in syncs:
+                syncs[first].result()
+            response = self.store.read(
+                model.resource_name, first, last, max(first, start), min(last, end)
+            )
+            for item in response["data"]:
+                model._deserialize(item, response["included"])
+            yield response
+
+    def _sync_window(self, model, first, last, params):
+        """Sync a window of the local store, only fetching it if it changed."""
+        window = self.store.window(model.resource_name, first, last)
+        headers = {}
+        if window and window[0]:
+            headers["If-None-Match"] = window[0]
+        if window and window[1]:
+            headers["If-Modified-Since"] = window[1]
+        params = {key: str(value) for key, value in params.items()}
+        res = self.timed.session.get(
+            model.url,
+            params={**params, "include": LOCAL_STORE_INCLUDE},
+            headers=headers,
+            timeout=TIMEOUT,
+        )
+        if window and res.status_code == HTTPStatus.NOT_MODIFIED:
+            self.store.touch(model.resource_name, first, last)
+        elif res.status_code == HTTPStatus.OK:
+            self.store.save(
+                model.resource_name,
+                first,
+                last,
+                res.json(),
+                etag=res.headers.get("ETag"),
+                last_modified=res.headers.get("Last-Modified"),
+            )
+        else:
+            error_handler("ERR_FETCHING_DATA_FAILED")
+
+    def _range_title(self, start, end, date_options):
+        """Describe the range of dates selected by the date options."""
+        if not any(date_options.values()):
+            return "today"
+        if start == end:
+            return start.isoformat()
+        return f"{start.isoformat()} - {end.isoformat()}"
+
+    def clear_cache(self):
+        """Clear the on-disk cache."""
+        self.cache.clear()
+        if self.store:
+            self.store.clear()
+        msg("Cache cleared.")
 
     def get_openid_configuration(self):
         """Return the OpenID configuration."""
         sso_discovery_url = self.config.get("sso_discovery_url")
+        cache = Cache("openid")
+        entry = cache.get(sso_discovery_url)
+        if entry and cache.fresh(entry):
+            return entry["data"]
 
         # Retrieve OpenID configuration
-        openid_configuration = requests.get(
+        res = self.session.get(
             f"{sso_discovery_url}/.well-known/openid-configuration", timeout=TIMEOUT
-        ).json()
+        )
+        openid_configuration = res.json()
         if "error" in openid_configuration:
-            error_handler("ERR_COULD_NOT_GET_OPENID_CONFIGURATION")
+            raise SSOError("ERR_COULD_NOT_GET_OPENID_CONFIGURATION")
 
+        ttl = self.config.get("openid_configuration_ttl", OPENID_CONFIGURATION_TTL)
+        cache.set(
+            sso_discovery_url,
+            openid_configuration,
+            ttl=max_age(res.headers.get("Cache-Control"), ttl),
+        )
         return openid_configuration
 
     def login(self):
         """Authenticates using device code."""
+        import webbrowser
+
         client_id = self.config.get("sso_client_id")
-        openid_configuration = self.get_openid_configuration()
+        try:
+            openid_configuration = self.get_openid_configuration()
+        except SSOError as exc:
+            error_handler(str(exc))
 
         if (
             "urn:ietf:params:oauth:grant-type:device_code"
@@ -145,13 +461,13 @@ class Timedctl:
             error_handler("ERR_SSO_DOES_NOT_SUPPORT_DEVICE_CODE")
 
         device_code_payload = {"client_id": client_id, "scope": "openid"}
-        device_code_response = requests.post(
+        device_code_response = self.session.post(
             openid_configuration["device_authorization_endpoint"],
             data=device_code_payload,
             timeout=TIMEOUT,
         )
 
-        if device_code_response.status_code != requests.codes.ok:
+        if device_code_response.status_code != HTTPStatus.OK:
             error_handler("ERR_GENERATING_DEVICE_CODE")
 
         device_code_data = device_code_response.json()
@@ -169,23 +485,16 @@ class Timedctl:
         }
 
         while True:
-            token_response = requests.post(
+            token_response = self.session.post(
                 openid_configuration["token_endpoint"],
                 data=token_payload,
                 timeout=TIMEOUT,
             )
             token_data = token_response.json()
 
-            if token_response.status_code == requests.codes.ok:
-                keyring.set_password(
-                    "system",
-                    "timedctl_token_" + client_id + "_access",
-                    token_data["access_token"],
-                )
-                keyring.set_password(
-                    "system",
-                    "timedctl_token_" + client_id + "_refresh",
-                    token_data["refresh_token"],
+            if token_response.status_code == HTTPStatus.OK:
+                self._save_tokens(
+                    token_data["access_token"], token_data["refresh_token"]
                 )
                 return token_data["access_token"]
             elif token_data["error"] not in ("authorization_pending", "slow_down"):
@@ -194,46 +503,68 @@ class Timedctl:
             else:
                 time.sleep(device_code_data["interval"])
 
-    def refresh_token(self, token, no_renew_token=False):
-        """Refresh token."""
+    def _request_token_refresh(self, token):
+        """Exchange a refresh token, return the new access token or None.
+
+        Raises SSOError if the SSO can't refresh tokens at all.
+        """
         client_id = self.config.get("sso_client_id")
         openid_configuration = self.get_openid_configuration()
 
         if "refresh_token" not in openid_configuration["grant_types_supported"]:
-            error_handler("ERR_SSO_DOES_NOT_SUPPORT_REFRESH")
+            raise SSOError("ERR_SSO_DOES_NOT_SUPPORT_REFRESH")
 
         token_payload = {
             "grant_type": "refresh_token",
             "refresh_token": token,
             "client_id": client_id,
         }
-        token_response = requests.post(
+        token_response = self.session.post(
             openid_configuration["token_endpoint"], data=token_payload, timeout=TIMEOUT
         )
         token_data = token_response.json()
 
-        if token_response.status_code != requests.codes.ok:
-            if no_renew_token:
-                error_handler("ERR_REFRESHING_TOKEN")
-
-            return self.login()
+        if token_response.status_code != HTTPStatus.OK:
+            return None
 
-        keyring.set_password(
-            "system",
-            "timedctl_token_" + client_id + "_access",
-            token_data["access_token"],
+        # the SSO might rotate refresh tokens
+        self._save_tokens(
+            token_data["access_token"], token_data.get("refresh_token", token)
         )
         return token_data["access_token"]
 
+    def _save_tokens(self, access_token, refresh_token):
+        """Store the tokens along with their expiry."""
+        self.tokens = token_bundle(access_token, refresh_token)
+        with self.profile.phase("token store"):
+            self.token_store.save(self.tokens)
+
+    def refresh_token(self, token, no_renew_token=False):
+        """Refresh token."""
+        try:
+            access_token = self._request_token_refresh(token)
+        except SSOError as exc:
+            error_handler(str(exc))
+        if access_token:
+            return access_token
+
+        if no_renew_token:
+            error_handler("ERR_REFRESHING_TOKEN")
+
+        return self.login()
+
+    def _refresh_in_background(self):
+        """Refresh the tokens before the access token expires."""
+        import requests
+
+        # if this fails, the next invocation refreshes the expired token
+        with contextlib.suppress(requests.RequestException, SSOError, ValueError):
+            self._request_token_refresh(self.tokens["refresh"])
+
     def force_renew(self):
         """Force a token renewal."""
-        self.oidc_client.autoconfig()
-        if self.oidc_client.start_browser_flow():
-            if token := self.oidc_client.get_token():
-                self.oidc_client.keyring_set(token)
-                msg("Token successfully renewed.")
-                return
-            error_handler("ERR_NO_TOKEN_RENEWAL_FAILED")
+        self.login()
+        msg("Token successfully renewed.")
 
     def _get_view(self, initial_view):
         max_key_lengths = [
@@ -245,179 +576,268 @@ class Timedctl:
         ]
         return view
 
-    def select_report(self, date):
+    def _stream_view(self, pages, columns):
+        """Pad the shown columns of pages of rows, widening them as pages arrive.
+
+        Yields the padded columns along with each row.
+        """
+        widths = None
+        for page in pages:
+            for row in page:
+                lengths = [len(value) for value in row[columns]]
+                widths = [max(pair) for pair in zip(widths or lengths, lengths)]
+            for row in page:
+                shown = [
+                    value.ljust(width) for value, width in zip(row[columns], widths)
+                ]
+                yield shown, row
+
+    def select_report(self, **date_options):
         """FZF prompt to select a report."""
-        reports = self.timed.reports.get(
-            filters={"date": date},
-            include="task,task.project,task.project.customer",
-        )
-        report_view = []
-        for report in reports:
-            task = report["relationships"]["task"]
-            report_view.append(
-                [
-                    task["attributes"]["name"],
-                    report["attributes"]["comment"],
-                    str(report["attributes"]["duration"]),
-                    task["id"],
-                    report["id"],
-                ],
-            )
-        report_view = self._get_view(report_view)
-        # create a list for fzf
-        fzf_obj = []
-        for row in report_view:
-            fzf_obj.append(
-                [" | ".join([row[0], row[1], row[2]]), row[1], row[2], row[3], row[4]],
-            )
+        start, end = date_range(**date_options)
+        # the date is only shown for ranges
+        columns = slice(0 if start != end else 1, 4)
+
+        def pages():
+            for response in self._get_reports(start, end, "task"):
+                resolver = IncludedResolver(response)
+                page = []
+                for report in response["data"]:
+                    task = resolver.resolve("tasks", report["relationships"]["task"])
+                    page.append(
+                        [
+                            report["attributes"]["date"].isoformat(),
+                            task["attributes"]["name"],
+                            report["attributes"]["comment"],
+                            str(report["attributes"]["duration"]),
+                            task["id"],
+                            report["id"],
+                        ],
+                    )
+                yield page
 
-        report = fzf_wrapper(fzf_obj, [0], "Select a report: ")
-        return report
+        # list the reports in fzf while later pages are still fetched
+        fzf_obj = (
+            # only pad the shown columns, the others are used as values
+            [" | ".join(shown), *row[2:]]
+            for shown, row in self._stream_view(pages(), columns)
+        )
+        return fzf_wrapper(fzf_obj, [0], "Select a report: ")
 
     def select_activity(self, date):
         """FZF prompt to select an activity."""
-        activities = self.timed.activities.get(filters={"date": date})
+        start, end = date_range(day=date)
+        response = next(self._get_activities(start, end, "task"))
+        resolver = IncludedResolver(response)
         activity_view = []
         # loop through all activities
-        for activity_obj in activities:
+        for activity_obj in response["data"]:
             # check if there is an actual task, else use an unknown task
-            task_data = activity_obj["relationships"]["task"]["data"]
-            if task_data:
-                task = self.timed.tasks.get(id=task_data["id"], cached=True)
-            else:
-                task = {"attributes": {"name": "Unknown task"}, "id": None}
+            task = resolver.resolve("tasks", activity_obj["relationships"]["task"]) or {
+                "attributes": {"name": "Unknown task"},
+                "id": None,
+            }
             activity_view.append(
                 [
                     task["attributes"]["name"],
                     activity_obj["attributes"]["comment"],
                     activity_obj["attributes"]["from-time"].strftime("%H:%M:%S")
                     + " - "
-                    + activity_obj["attributes"]["to-time"].strftime("%H:%M:%S"),
+                    + (
+                        activity_obj["attributes"]["to-time"].strftime("%H:%M:%S")
+                        if activity_obj["attributes"]["to-time"]
+                        else "running"
+                    ),
                     task["id"],
                     activity_obj["id"],
                 ],
             )
-        activity_view = self._get_view(activity_view)
         # create a list for fzf
+        view = self._get_view([row[:3] for row in activity_view])
         fzf_obj = []
-        for row in activity_view:
-            fzf_obj.append(
-                [" | ".join([row[0], row[1], row[2]]), row[1], row[2], row[3], row[4]],
-            )
+        for shown, row in zip(view, activity_view, strict=True):
+            fzf_obj.append([" | ".join(shown), *row[1:]])
 
         activity_obj = fzf_wrapper(fzf_obj, [0], "Select an activity: ")
         return activity_obj
 
-    def format_activity(self, activity_obj):
-        """Format an activity for display."""
-        task_obj = activity_obj["relationships"]["task"]
-
-        task = task_obj["attributes"]["name"]
-
-        project_obj = self.timed.projects.get(
-            id=task_obj["relationships"]["project"]["id"],
-            cached=True,
-        )
-        project = project_obj["attributes"]["name"]
-
-        customer_obj = self.timed.customers.get(
-            id=project_obj["relationships"]["customer"]["data"]["id"],
-            cached=True,
+    def _task_path(self, task, resolver):
+        """Return the customer, project and task name of a task."""
+        project_rel = task["relationships"]["project"]
+        try:
+            # fall back to the cache if the response didn't include the hierarchy
+            project = resolver.resolve("projects", project_rel) or self._get_cached(
+                self.timed.projects,
+                id=relationship_id(project_rel),
+            )
+            customer_rel = project["relationships"]["customer"]
+            customer = resolver.resolve("customers", customer_rel) or self._get_cached(
+                self.timed.customers,
+                id=relationship_id(customer_rel),
+            )
+        except FetchError as exc:
+            error_handler(str(exc))
+        return (
+            customer["attributes"]["name"],
+            project["attributes"]["name"],
+            task["attributes"]["name"],
         )
-        customer = customer_obj["attributes"]["name"]
-        return f"{customer} > {project} > {task}"
 
-    def _get_by_name(self, items, name):
-        return next(
-            (i for i in items if i["attributes"]["name"] == name),
-            None,
+    def format_activity(self, activity_obj, resolver):
+        """Format an activity for display."""
+        task = resolver.resolve("tasks", activity_obj["relationships"]["task"])
+        if not task:
+            return "Unknown task"
+        return " > ".join(self._task_path(task, resolver))
+
+    def _build_task_index(self, archived):
+        """Build the task index from the revalidated customers, projects and tasks."""
+        filters = {"archived": archived}
+        return build_task_index(
+            *self.aio.run(
+                *(
+                    self.aio.call(
+                        self._get_cached, model, filters=filters, revalidate=True
+                    )
+                    for model in (
+                        self.timed.customers,
+                        self.timed.projects,
+                        self.timed.tasks,
+                    )
+                )
+            )
         )
 
-    def get_customer_by_name(self, customers, name, archived):
+    def _task_index(self, archived, rebuild=False):
+        """Return the task index, refreshing it in the background when stale."""
+        if archived in self.task_indexes:
+            return self.task_indexes[archived]
+        key = f"task-index?archived={int(archived)}"
+        entry = None if rebuild else self.cache.get(key)
+        if not entry:
+            try:
+                entry = self.cache.set(key, self._build_task_index(archived))
+            except FetchError as exc:
+                error_handler(str(exc))
+            # a rebuilt index is up to date for the rest of the invocation
+            self.task_indexes[archived] = TaskIndex(entry["data"])
+            return self.task_indexes[archived]
+        if not self.cache.fresh(entry):
+            threading.Thread(
+                target=self._refresh_task_index, args=(key, archived)
+            ).start()
+        return TaskIndex(entry["data"])
+
+    def _refresh_task_index(self, key, archived):
+        """Rebuild a stale task index, it is retried next time if timed is down."""
+        import requests
+
+        with contextlib.suppress(requests.RequestException, FetchError):
+            self.cache.set(key, self._build_task_index(archived))
+
+    def _lookup(self, archived, lookup, error):
+        """Look up an id in the task index, rebuilding the index on a miss."""
+        found = lookup(self._task_index(archived))
+        if found is None and archived not in self.task_indexes:
+            found = lookup(self._task_index(archived, rebuild=True))
+        return found or error_handler(error)
+
+    def get_customer_by_name(self, name, archived):
         """Get customer by name."""
-        customers = self.timed.customers.get(
-            cached=True,
-            filters={"archived": archived},
+        return self._lookup(
+            archived,
+            lambda index: index.customer_id(name),
+            "ERR_CUSTOMER_NOT_FOUND",
         )
-        if customer := self._get_by_name(customers, name):
-            return customer["id"]
-        error_handler("ERR_CUSTOMER_NOT_FOUND")
 
-    def get_project_by_name(self, projects, name, customer_id, archived):
+    def get_project_by_name(self, name, customer_id, archived):
         """Get project by name."""
-        projects = self.timed.projects.get(
-            cached=True,
-            filters={"customer": customer_id, "archived": archived},
+        return self._lookup(
+            archived,
+            lambda index: index.project_id(customer_id, name),
+            "ERR_PROJECT_NOT_FOUND",
         )
-        if project := self._get_by_name(projects, name):
-            return project["id"]
-        error_handler("ERR_PROJECT_NOT_FOUND")
 
-    def get_task_by_name(self, tasks, name, project_id, archived):
+    def get_task_by_name(self, name, project_id, archived):
         """Get task by name."""
-        tasks = self.timed.tasks.get(
-            cached=True,
-            filters={"project": project_id, "archived": archived},
+        return self._lookup(
+            archived,
+            lambda index: index.task_id(project_id, name),
+            "ERR_TASK_NOT_FOUND",
         )
-        if task := self._get_by_name(tasks, name):
-            return task["id"]
-        error_handler("ERR_TASK_NOT_FOUND")
 
-    def select_task(self, customer, project, task, show_archived):
-        """Select a task ID with fzf."""
-        # select a customer
-        customers = self.timed.customers.get(
-            filters={"archived": show_archived},
-            cached=True,
-        )
+    def select_task(self, customer, project, task, show_archived, prefetch=()):
+        """Select a task ID with fzf.
+
+        The requests in prefetch are started while the user picks the task.
+        """
+        for key, func in prefetch:
+            self.prefetcher.start(key, func)
         if customer:
-            customer_id = self.get_customer_by_name(customers, customer, show_archived)
-        else:
-            customer_id = fzf_wrapper(
-                customers,
-                ["attributes", "name"],
-                "Select a customer: ",
-            )["id"]
-        # get projects
-        projects = self.timed.projects.get(
-            filters={"customer": customer_id, "archived": show_archived},
-            cached=True,
-        )
-        # select a project
-        if project:
-            project_id = self.get_project_by_name(
-                projects,
-                project,
-                customer_id,
-                show_archived,
-            )
-        else:
-            project_id = fzf_wrapper(
-                projects,
-                ["attributes", "name"],
-                "Select a project: ",
-            )["id"]
-        # get tasks
-        tasks = self.timed.tasks.get(
-            filters={"project": project_id, "archived": show_archived},
-            cached=True,
+            customer_id = self.get_customer_by_name(customer, show_archived)
+            if project:
+                project_id = self.get_project_by_name(
+                    project, customer_id, show_archived
+                )
+                if task:
+                    return self.get_task_by_name(task, project_id, show_archived)
+        # select from all paths matching the given names
+        tasks = self._lookup(
+            show_archived,
+            lambda index: index.find(customer, project, task) or None,
+            "ERR_TASK_NOT_FOUND",
         )
-        # select a task
-        if task:
-            task_id = self.get_task_by_name(tasks, task, project_id, show_archived)
-        else:
-            task_id = fzf_wrapper(tasks, ["attributes", "name"], "Select a task: ")[
-                "id"
-            ]
+        if task and len(tasks) == 1:
+            return tasks[0]["id"]
+        entry = self.cache.get(TASK_HISTORY_KEY)
+        history = entry["data"] if entry else []
+        task_id = fzf_wrapper(by_recency(tasks, history), ["path"], "Select a task: ")[
+            "id"
+        ]
+        self.cache.set(TASK_HISTORY_KEY, remember(history, task_id), HISTORY_TTL)
         return task_id
 
+    def _prefetch_me(self):
+        """Return the prefetch of the current user."""
+        return ("me", lambda: self.timed.users.me)
+
+    def _prefetch_current_activity(self):
+        """Return the prefetch of the current activity."""
+        return ("current", self._get_current_activity)
+
+    def _get_current_activity(self):
+        """Get the current activity, or an empty dict if there is none."""
+        # the default day of libtimed is the day it was imported
+        activities = self.timed.activities.get({"active": True, "day": date.today()})
+        return activities[0] if activities else {}
+
+    def close(self):
+        """Store the prefetch counters and finish the profile of the invocation."""
+        if self.timed is not None and self.prefetcher.prefetched:
+            entry = self.cache.get(PREFETCH_STATS_KEY)
+            total = add_stats(entry["data"] if entry else {}, self.prefetcher.stats())
+            self.cache.set(PREFETCH_STATS_KEY, total, HISTORY_TTL)
+        self.profile.finish(self.session if self.timed is not None else None)
+
+    def cache_stats(self):
+        """Show how many prefetched requests were used."""
+        entry = self.cache.get(PREFETCH_STATS_KEY)
+        stats = entry["data"] if entry else {"prefetched": 0, "hits": 0, "misses": 0}
+        msg(f"Prefetched requests: {stats['prefetched']}")
+        msg(f"Used (hits): {stats['hits']}")
+        msg(f"Made after a prompt (misses): {stats['misses']}")
+        msg(f"Hit rate: {hit_rate(stats):.0%}")
+
     def get_customers(self, output_format):
         """Get customers."""
-        customers = self.timed.customers.get(cached=True)
-        output = [
+        try:
+            customers = self._get_cached(self.timed.customers)
+        except FetchError as exc:
+            error_handler(str(exc))
+        output = (
             {"id": customer["id"], "name": customer["attributes"]["name"]}
             for customer in customers
-        ]
+        )
         output_formatted(output, output_format)
 
     def get_projects(self, output_format, customer_id, customer_name, archived):
@@ -426,16 +846,18 @@ class Timedctl:
             error_handler("ERR_MISSING_ARGUMENTS")
         # Get customer ID if name is specified
         if not customer_id:
-            customers = self.timed.customers.get(cached=True)
-            customer_id = self.get_customer_by_name(customers, customer_name, archived)
-        projects = self.timed.projects.get(
-            cached=True,
-            filters={"customer": customer_id},
-        )
-        output = [
+            customer_id = self.get_customer_by_name(customer_name, archived)
+        try:
+            projects = self._get_cached(
+                self.timed.projects,
+                filters={"customer": customer_id},
+            )
+        except FetchError as exc:
+            error_handler(str(exc))
+        output = (
             {"id": project["id"], "name": project["attributes"]["name"]}
             for project in projects
-        ]
+        )
         output_formatted(output, output_format)
 
     def get_tasks(
@@ -456,118 +878,214 @@ class Timedctl:
         if not project_id:
             # we need an id for the customer
             if not customer_id:
-                customers = self.timed.customers.get(cached=True)
-                customer_id = self.get_customer_by_name(
-                    customers,
-                    customer_name,
-                    archived,
-                )
-            # get the project id
-            projects = self.timed.projects.get(
-                cached=True,
-                filters={"customer": customer_id},
-            )
+                customer_id = self.get_customer_by_name(customer_name, archived)
             project_id = self.get_project_by_name(
-                projects,
                 project_name,
                 customer_id,
                 archived,
             )
         # get the tasks for the specified project
-        tasks = self.timed.tasks.get(cached=True, filters={"project": project_id})
-        output = [
+        try:
+            tasks = self._get_cached(
+                self.timed.tasks,
+                filters={"project": project_id},
+            )
+        except FetchError as exc:
+            error_handler(str(exc))
+        output = (
             {"id": task["id"], "name": task["attributes"]["name"]} for task in tasks
-        ]
+        )
         output_formatted(output, output_format)
 
     def get_overtime(self, date):
         """Get overtime of user."""
         user = self.timed.users.me["id"]
-        overtime = self.timed.overtime.get({"user": user, "date": date})
+        overtime = self.timed.overtime.get(
+            {"user": user, "date": date or datetime.now().date()}
+        )
         msg(f"Current overtime is: {overtime}")
 
-    def get_reports(self, date):
+    def get_reports(self, **date_options):
         """Get reports."""
-        reports = self.timed.reports.get(
-            filters={"date": date},
-            include="task,task.project,task.project.customer",
-        )
-        title = f"Activities for {date if date is not None else 'today'}:"
-        table = Table(
-            "Customer",
-            "Project",
-            "Task",
-            "Comment",
-            "Duration",
-            title=title,
-            title_style="bold",
-            show_lines=True,
-        )
-        total = timedelta(days=0)
-        for report in reports:
-            task_obj = report["relationships"]["task"]
-            project_obj = task_obj["relationships"]["project"]
-            customer_obj = project_obj["relationships"]["customer"]
-            # get name attributes
-            task, project, customer = (
-                x["attributes"]["name"] for x in [task_obj, project_obj, customer_obj]
+        start, end = date_range(**date_options)
+        title = f"Reports for {self._range_title(start, end, date_options)}:"
+        columns = ["Customer", "Project", "Task", "Comment", "Duration"]
+        if start != end:
+            columns.insert(0, "Date")
+
+        def rows():
+            include = "task,task.project,task.project.customer"
+            for response in self._get_reports(start, end, include):
+                resolver = IncludedResolver(response)
+                for report in response["data"]:
+                    attributes = report["attributes"]
+                    task_obj = resolver.resolve(
+                        "tasks", report["relationships"]["task"]
+                    )
+                    customer, project, task = self._task_path(task_obj, resolver)
+                    duration: timedelta = attributes["duration"]
+                    day = [attributes["date"].isoformat()] if start != end else []
+                    cells = [customer, project, task, attributes["comment"]]
+                    yield [*day, *cells, str(duration)], duration
+
+        print_table(columns, rows(), title, total_column=len(columns) - 1)
+
+    def _task_names(self, task_ids):
+        """Return the customer, project and task names of tasks by id."""
+        names = {}
+        for archived in (False, True):
+            index = self._task_index(archived)
+            missing = task_ids - names.keys()
+            known = {int(entry["id"]) for entry in index.entries}
+            if not missing <= known and archived not in self.task_indexes:
+                # tasks created since the index was cached
+                index = self._task_index(archived, rebuild=True)
+            names.update(
+                (int(entry["id"]), entry["names"])
+                for entry in index.entries
+                if int(entry["id"]) in missing
             )
-            comment = report["attributes"]["comment"]
-            duration: timedelta = report["attributes"]["duration"]
-            total += duration
-
-            table.add_row(customer, project, task, comment, str(duration))
-        table.add_row("", "", "", "", str(total))
-        print(table)
-
-    def get_activities(self, date):
-        """Get activities."""
-        activities = self.timed.activities.get(
-            filters={"day": date},
-            include="task,task.project,task.project.customer",
+            if task_ids <= names.keys():
+                break
+        return names
+
+    def stats(self, by, pivot_by, output_format, **date_options):
+        """Show how the time in a range of dates was spent."""
+        from rich.table import Table
+
+        from timedctl.stats import (
+            DIMENSIONS,
+            ReportColumns,
+            format_duration,
+            pivot,
+            rollups,
         )
-        title = f"Activities for {date if date is not None else 'today'}:"
-        table = Table(
-            "Activity",
-            "Comment",
-            "Start",
-            "End",
-            title=title,
-            title_style="bold",
-            show_lines=True,
-        )
-        total_time = timedelta()
-        for activity_obj in activities:
-            attributes = activity_obj["attributes"]
-
-            activity_fmt = self.format_activity(activity_obj)
-            comment = attributes["comment"]
-            from_time_fmt = attributes["from-time"].strftime("%H:%M:%S")
-
-            to_time = attributes["to-time"]
-            to_time_fmt = "active"
-            if to_time:
-                # Format the time if set
-                to_time_fmt = to_time.strftime("%H:%M:%S")
-                # Temporary timedelta
-                tmp_timedelta = to_time - attributes["from-time"]
-                # Add the rounded timedelta to the total time
-                rounding_factor = timedelta(minutes=15)
-                rounded_time = (
-                    (tmp_timedelta + rounding_factor - timedelta(seconds=1))
-                    // rounding_factor
-                    * rounding_factor
-                )
-                total_time += rounded_time
 
-            table.add_row(activity_fmt, comment, from_time_fmt, to_time_fmt)
+        rows = by[0] if by else "customer"
+        if pivot_by and (len(by) > 1 or pivot_by == rows):
+            error_handler("ERR_INVALID_PIVOT")
+        start, end = date_range(**date_options)
+        title = self._range_title(start, end, date_options)
+        columns = ReportColumns()
+        # names are looked up in the task index, no need to include them
+        for response in self._get_reports(start, end, None):
+            columns.extend(response["data"])
+        if not len(columns):
+            msg(f"No reports for {title}.")
+            return
+        names = self._task_names(columns.task_ids())
+
+        if pivot_by:
+            col_keys, pivot_rows = pivot(columns, names, rows, pivot_by)
+            if output_format == "csv":
+                output_formatted(
+                    (
+                        {
+                            rows: key,
+                            **{col: round(row[col] / 3600, 2) for col in col_keys},
+                            "total": round(sum(row.values()) / 3600, 2),
+                        }
+                        for key, row in pivot_rows
+                    ),
+                    "csv",
+                )
+                return
+            table = Table(
+                rows.capitalize(),
+                *col_keys,
+                "Total",
+                title=f"By {rows} and {pivot_by}:",
+                title_style="bold",
+            )
+            for key, row in pivot_rows:
+                table.add_row(
+                    key,
+                    *(
+                        format_duration(row[col]) if row[col] else ""
+                        for col in col_keys
+                    ),
+                    format_duration(sum(row.values())),
+                )
+            print(table)
+            return
+
+        total = sum(columns.durations)
+        sums = rollups(columns, names)
+        if output_format == "csv":
+            output_formatted(
+                (
+                    {
+                        "dimension": dimension,
+                        "key": key,
+                        "duration": format_duration(duration),
+                        "hours": round(duration / 3600, 2),
+                    }
+                    for dimension in by or DIMENSIONS
+                    for key, duration in sums[dimension].items()
+                ),
+                "csv",
+            )
+            return
+        for dimension in by or DIMENSIONS:
+            table = Table(
+                dimension.capitalize(),
+                "Duration",
+                "Share",
+                title=f"By {dimension}:",
+                title_style="bold",
+            )
+            for key, duration in sums[dimension].items():
+                table.add_row(key, format_duration(duration), f"{duration / total:.0%}")
+            print(table)
+        msg(f"Total for {title}: {format_duration(total)}")
 
-        print(table)
+    def get_activities(self, **date_options):
+        """Get activities."""
+        start, end = date_range(**date_options)
+        title = f"Activities for {self._range_title(start, end, date_options)}:"
+        columns = ["Activity", "Comment", "Start", "End"]
+        if start != end:
+            columns.insert(0, "Date")
+
+        def rows():
+            include = "task,task.project,task.project.customer"
+            for response in self._get_activities(start, end, include):
+                resolver = IncludedResolver(response)
+                for activity_obj in response["data"]:
+                    attributes = activity_obj["attributes"]
+
+                    activity_fmt = self.format_activity(activity_obj, resolver)
+                    comment = attributes["comment"]
+                    from_time_fmt = attributes["from-time"].strftime("%H:%M:%S")
+
+                    to_time = attributes["to-time"]
+                    to_time_fmt = "active"
+                    rounded_time = timedelta()
+                    if to_time:
+                        # Format the time if set
+                        to_time_fmt = to_time.strftime("%H:%M:%S")
+                        # Temporary timedelta
+                        tmp_timedelta = to_time - attributes["from-time"]
+                        # Round the time up to a quarter of an hour for the total
+                        rounding_factor = timedelta(minutes=15)
+                        rounded_time = (
+                            (tmp_timedelta + rounding_factor - timedelta(seconds=1))
+                            // rounding_factor
+                            * rounding_factor
+                        )
+
+                    day = [attributes["date"].isoformat()] if start != end else []
+                    cells = [activity_fmt, comment, from_time_fmt, to_time_fmt]
+                    yield [*day, *cells], rounded_time
+
+        total_time = print_table(columns, rows(), title)
         msg(f"Total: {total_time}")
 
-    def delete_report(self, date):
+    def delete_report(self, **date_options):
         """Delete report(s)."""
-        report = self.select_report(date)
+        import pyfzf
+
+        report = self.select_report(**date_options)
         res = pyfzf.FzfPrompt().prompt(
             ["Yes", "No"],
             f"--prompt 'Are you sure? Delete \"{report[1]}\"?'",
@@ -575,8 +1093,10 @@ class Timedctl:
         if res[0] != "Yes":
             error_handler("ERR_DELETION_ABORTED")
         req = self.timed.reports.delete(report[-1])
-        if req.status_code != requests.codes["no_content"]:
+        if req.status_code != HTTPStatus.NO_CONTENT:
             error_handler("ERR_DELETION_FAILED")
+        if self.store:
+            self.store.forget("reports", report[-1])
         msg(f'Deleted report "{report[1]}"')
 
     def add_report(
@@ -590,31 +1110,141 @@ class Timedctl:
     ):
         """Add report(s)."""
         # select a task
-        task_id = self.select_task(customer, project, task, show_archived)
+        task_id = self.select_task(
+            customer, project, task, show_archived, [self._prefetch_me()]
+        )
         # ask the user to enter a description
         if not description:
             msg("Enter a description")
             # get description
             description = click.prompt("")
         # ask the user to enter a duration
-        if duration and re.match(r"^\d{1,2}:\d{2}:\d{2}$", duration) is None:
-            error_handler("ERR_INVALID_DURATION")
-        else:
+        if not duration:
             duration = time_picker()
+        elif re.match(r"^\d{1,2}:\d{2}:\d{2}$", duration) is None:
+            error_handler("ERR_INVALID_DURATION")
         # create the report
-        res = self.timed.reports.post(
-            {"duration": duration, "comment": description},
-            {
-                "task": task_id,
-            },
+        operation = {
+            "type": "add-report",
+            "date": date.today().isoformat(),
+            "task": task_id,
+            "comment": description,
+            "duration": duration,
+        }
+        if self._write(operation):
+            msg("Report created successfully")
+
+    def _parse_report_rows(self, rows, archived):
+        """Parse all rows of a report file, rebuilding the task index on a miss.
+
+        Returns the reports and the errors, both with their line numbers.
+        """
+        from timedctl.reportfile import RowError, UnknownTaskError, parse_row
+
+        index = self._task_index(archived)
+        while True:
+            reports, errors, unknown_task = [], [], False
+            for line, row in rows:
+                try:
+                    reports.append((line, parse_row(row, index)))
+                except RowError as exc:
+                    unknown_task |= isinstance(exc, UnknownTaskError)
+                    errors.append((line, str(exc)))
+            # the task might be newer than the cached index
+            if not unknown_task or archived in self.task_indexes:
+                return reports, errors
+            index = self._task_index(archived, rebuild=True)
+
+    def _split_duplicates(self, reports):
+        """Split reports into new ones and ones existing already, by line number."""
+        from timedctl.reportfile import report_key
+
+        dates = [report["date"] for _, report in reports]
+        existing = {
+            report_key(
+                {
+                    **report["attributes"],
+                    "task": relationship_id(report["relationships"]["task"]),
+                }
+            )
+            for response in self._get_reports(min(dates), max(dates), None)
+            for report in response["data"]
+        }
+        new, skipped = [], []
+        for line, report in reports:
+            key = report_key(report)
+            (skipped if key in existing else new).append((line, report))
+            # the same row twice in a file is a duplicate as well
+            existing.add(key)
+        return new, skipped
+
+    def _post_report(self, report, user):
+        """Create a report, unless a failed attempt created it already."""
+        return self._send(
+            self.timed.reports.post,
+            {key: report[key] for key in ("date", "comment", "duration")},
+            {"task": report["task"], "user": user},
+            find=lambda: self._find_report(
+                user,
+                report["date"],
+                report["task"],
+                report["comment"],
+                report["duration"],
+            ),
+        )
+
+    def _post_reports(self, reports):
+        """Create reports concurrently, returning the created and failed lines."""
+        user = self.prefetcher.get(*self._prefetch_me())["id"]
+        created, failed = [], []
+        for (line, report), _, error in run_concurrently(
+            lambda item: self._post_report(item[1], user),
+            reports,
+            self.config.get("parallel_requests", PARALLEL_REQUESTS),
+        ):
+            if error:
+                failed.append((line, error))
+                continue
+            created.append(line)
+            if self.store:
+                self.store.forget_date("reports", report["date"].isoformat())
+        return created, sorted(failed)
+
+    def import_reports(self, file, file_format, show_archived):
+        """Add the reports listed in a CSV or NDJSON file."""
+        from timedctl import reportfile
+
+        self.prefetcher.start(*self._prefetch_me())
+        fmt = file_format or reportfile.file_format(file.name)
+        rows = list(reportfile.read_rows(file, fmt))
+        # validate everything before the first report is created
+        reports, errors = self._parse_report_rows(rows, show_archived)
+        for line, error in errors:
+            msg(f"Line {line}: {error}")
+        if errors:
+            error_handler("ERR_INVALID_REPORT_FILE")
+        if not reports:
+            msg("No reports to import.")
+            return
+
+        new, skipped = self._split_duplicates(reports)
+        created, failed = self._post_reports(new)
+        for line, _ in skipped:
+            msg(f"Line {line}: skipped, the report exists already")
+        for line, error in failed:
+            msg(f"Line {line}: failed, {error}")
+        msg(
+            f"{len(created)} created, {len(skipped)} skipped as duplicates,"
+            f" {len(failed)} failed."
         )
-        if res.status_code != requests.codes["created"]:
-            error_handler("ERR_REPORT_CREATION_FAILED")
-        msg("Report created successfully")
+        if failed:
+            error_handler("ERR_REPORT_IMPORT_INCOMPLETE")
 
-    def edit_report(self, date):
+    def edit_report(self, **date_options):
         """Edit report(s)."""
-        report = self.select_report(date)
+        import pyfzf
+
+        report = self.select_report(**date_options)
 
         msg("Comment", True)
         comment = click.prompt("", default=report[1].strip())
@@ -622,14 +1252,16 @@ class Timedctl:
         res = pyfzf.FzfPrompt().prompt(["No", "Yes"], "--prompt 'Are you sure?'")
         if res != ["Yes"]:
             error_handler("ERR_REPORT_UPDATE_ABORTED")
-        res = self.timed.reports.patch(
-            report[-1],
-            {"comment": comment, "duration": duration},
-            {"task": report[-2]},
-        )
-        if res.status_code != requests.codes["ok"]:
-            error_handler("ERR_REPORT_UPDATE_FAILED")
-        msg("Report updated successfully")
+        operation = {
+            "type": "edit-report",
+            "id": report[-1],
+            "task": report[-2],
+            "comment": comment,
+            "duration": duration,
+            "original": {"comment": report[1], "duration": report[2]},
+        }
+        if self._write(operation):
+            msg("Report updated successfully")
 
     def start_activity(self, comment, customer, project, task, show_archived, start):
         """Start recording activity."""
@@ -641,57 +1273,235 @@ class Timedctl:
             if re.match(r"^\d{2}:\d{2}$", start):
                 start = f"{start}:00"
 
-        task_id = self.select_task(customer, project, task, show_archived)
-        # create the activity
-        res = self.timed.activities.start(
-            attributes={"comment": comment, "from-time": start},
-            relationships={"task": task_id},
+        task_id = self.select_task(
+            customer,
+            project,
+            task,
+            show_archived,
+            [self._prefetch_me(), self._prefetch_current_activity()],
         )
-        if res.status_code != requests.codes["created"]:
-            error_handler("ERR_ACTIVITY_START_FAILED")
-        msg(f"Activity {comment} started successfully.")
+        now = datetime.now()
+        operation = {
+            "type": "start-activity",
+            "date": now.date().isoformat(),
+            "from-time": start or now.strftime("%H:%M:%S"),
+            "task": task_id,
+            "comment": comment,
+        }
+        sent = self._write(operation)
+        self._save_started_activity(operation, show_archived)
+        if sent:
+            msg(f"Activity {comment} started successfully.")
 
     def stop_activity(self):
         """Stop current activity."""
-        if not self.timed.activities.current:
-            error_handler("ERR_NO_CURRENT_ACTIVITY")
-        self.timed.activities.stop()
-        msg("Activity stopped successfully.")
+        now = datetime.now()
+        operation = {
+            "type": "stop-activity",
+            "date": now.date().isoformat(),
+            "to-time": now.strftime("%H:%M:%S"),
+        }
+        sent = self._write(operation)
+        self._save_current_activity(None)
+        if sent:
+            msg("Activity stopped successfully.")
+
+    def _save_current_activity(self, snapshot):
+        """Store the current activity, so showing it needs no request."""
+        interval = self.config.get("snapshot_check_interval", SNAPSHOT_CHECK_INTERVAL)
+        self.cache.set(CURRENT_ACTIVITY_KEY, snapshot, ttl=interval)
+
+    def _save_started_activity(self, operation, archived):
+        """Store an activity from the write starting it."""
+        import requests
+
+        task = self._task_index(archived).path(operation["task"])
+        if not task:
+            try:
+                task_obj = self._get_cached(self.timed.tasks, id=operation["task"])
+                task = " > ".join(self._task_path(task_obj, IncludedResolver({})))
+            except (requests.RequestException, FetchError):
+                task = "Unknown task"
+        self._save_current_activity(
+            {
+                "task": task,
+                "comment": operation["comment"],
+                "start": f"{operation['date']}T{operation['from-time']}",
+            }
+        )
 
-    def show_activity(self, short):
-        """Show current activity."""
-        current_activity = self.timed.activities.get(
-            filters={"active": True},
+    def _snapshot(self, response):
+        """Return the snapshot of the current activity in a response."""
+        if not response["data"]:
+            return None
+        activity_obj = response["data"][0]
+        attr = activity_obj["attributes"]
+        return {
+            "task": self.format_activity(activity_obj, IncludedResolver(response)),
+            "comment": attr["comment"],
+            "start": datetime.combine(
+                attr["date"], attr["from-time"].time()
+            ).isoformat(),
+        }
+
+    def _fetch_current_activity(self):
+        """Get the current activity from timed and store it."""
+        self.ensure_setup()
+        response = self.timed.activities.get(
+            filters={"active": True, "day": date.today()},
             include="task,task.project,task.project.customer",
+            raw=True,
         )
-        if not current_activity:
+        snapshot = self._snapshot(response)
+        self._save_current_activity(snapshot)
+        return snapshot
+
+    def _format_snapshot(self, snapshot, template):
+        """Format the current activity with a template."""
+        start = datetime.fromisoformat(snapshot["start"])
+        elapsed = timedelta(seconds=int((datetime.now() - start).total_seconds()))
+        try:
+            return template.format(
+                task=snapshot["task"],
+                comment=snapshot["comment"],
+                start=start,
+                elapsed=elapsed,
+                pending=len(self.journal),
+            )
+        except (KeyError, IndexError, ValueError):
+            error_handler("ERR_INVALID_FORMAT")
+
+    def show_activity(self, short, template):
+        """Show current activity."""
+        # status bars poll the short form, it is served from the snapshot
+        entry = self.cache.get(CURRENT_ACTIVITY_KEY) if short or template else None
+        if entry and self.cache.fresh(entry):
+            snapshot = entry["data"]
+        else:
+            snapshot = self._fetch_current_activity()
+        if not snapshot:
             error_handler("ERR_NO_CURRENT_ACTIVITY")
-        activity_obj = current_activity[0]
-        comment = " > " + activity_obj["attributes"]["comment"] if not short else ""
-        start = activity_obj["attributes"]["from-time"].strftime("%H:%M:%S")
+
+        if template:
+            click.echo(self._format_snapshot(snapshot, template))
+            return
+        start = datetime.fromisoformat(snapshot["start"])
+        comment = " > " + snapshot["comment"] if not short else ""
+        pending = len(self.journal)
         msg(
-            f"Current activity: {self.format_activity(activity_obj)}{comment}"
-            + f"  (Since {start})",
+            f"Current activity: {snapshot['task']}{comment}"
+            + f"  (Since {start.strftime('%H:%M:%S')})"
+            + (f"  ({pending} queued)" if pending else ""),
+        )
+
+    def _poll_current_activity(self, etag):
+        """Get the current activity, unless it is unchanged since the ETag.
+
+        Returns the ETag and snapshot, or None if the activity didn't change.
+        Raises FetchError if timed doesn't answer with the activity.
+        """
+        # the default day of libtimed is the day it was imported
+        params = self.timed.activities._parse_filters(
+            {"active": True, "day": date.today()}
+        )
+        res = self.timed.session.get(
+            self.timed.activities.url,
+            params={**params, "include": "task,task.project,task.project.customer"},
+            headers={"If-None-Match": etag} if etag else {},
+            timeout=TIMEOUT,
         )
+        if etag and res.status_code == HTTPStatus.NOT_MODIFIED:
+            return None
+        if res.status_code != HTTPStatus.OK:
+            raise FetchError("ERR_FETCHING_DATA_FAILED")
+        response = res.json()
+        for item in response["data"]:
+            self.timed.activities._deserialize(item, response.get("included", []))
+        snapshot = self._snapshot(response)
+        self._save_current_activity(snapshot)
+        return res.headers.get("ETag"), snapshot
+
+    def _watch_line(self, snapshot, stream, template):
+        """Format the current activity for a tick of `activity watch`."""
+        if stream:
+            if not snapshot:
+                return json.dumps({"active": False, "pending": len(self.journal)})
+            start = datetime.fromisoformat(snapshot["start"])
+            return json.dumps(
+                {
+                    "active": True,
+                    **snapshot,
+                    "elapsed": int((datetime.now() - start).total_seconds()),
+                    "pending": len(self.journal),
+                }
+            )
+        if not snapshot:
+            return "No current activity"
+        return self._format_snapshot(
+            snapshot, template or "Current activity: {task} > {comment}  ({elapsed})"
+        )
+
+    def watch_activity(self, stream, template):
+        """Show the current activity until interrupted.
+
+        The elapsed time is updated every second without a request, timed is
+        polled less often the longer the activity stays the same.
+        """
+        import requests
+        from rich.live import Live
+        from rich.text import Text
+
+        min_interval = self.config.get("watch_interval", WATCH_INTERVAL)
+        max_interval = self.config.get("watch_max_interval", WATCH_MAX_INTERVAL)
+        interval, next_poll = min_interval, 0
+        etag, snapshot = None, None
+        live = None
+        if not stream and rich.get_console().is_terminal:
+            live = Live(console=rich.get_console(), auto_refresh=False)
+        with contextlib.suppress(KeyboardInterrupt), live or contextlib.nullcontext():
+            while True:
+                if time.monotonic() >= next_poll:
+                    try:
+                        # the tokens expire while watching
+                        self._refresh_tokens()
+                        polled = self._poll_current_activity(etag)
+                    except (requests.RequestException, FetchError, SSOError):
+                        # keep showing the last known activity, back off
+                        polled = None
+                    if polled:
+                        etag, snapshot = polled
+                        interval = min_interval
+                    else:
+                        interval = min(interval * 2, max_interval)
+                    next_poll = time.monotonic() + interval
+                line = self._watch_line(snapshot, stream, template)
+                if live:
+                    live.update(Text(line), refresh=True)
+                else:
+                    click.echo(line)
+                # redraw at the start of the next second
+                time.sleep(1 - time.time() % 1)
 
     def restart_activity(self, date):
         """Restart an activity."""
-        # stop current activity first
-        if self.timed.activities.current:
-            self.timed.activities.stop()
-            msg("Stopped current activity.")
-        # select an activity
+        # starting the activity stops the current one
+        self.prefetcher.start(*self._prefetch_me())
+        self.prefetcher.start(*self._prefetch_current_activity())
         activity_obj = self.select_activity(date)
         # grab attributes
         comment = activity_obj[1]
-        task_id = activity_obj[3]
-        res = self.timed.activities.start(
-            attributes={"comment": comment},
-            relationships={"task": task_id},
-        )
-        if res.status_code != requests.codes["created"]:
-            error_handler("ERR_ACTIVITY_START_FAILED")
-        msg(f'Activity "{comment}" restarted successfully.')
+        now = datetime.now()
+        operation = {
+            "type": "start-activity",
+            "date": now.date().isoformat(),
+            "from-time": now.strftime("%H:%M:%S"),
+            "task": activity_obj[3],
+            "comment": comment,
+        }
+        sent = self._write(operation)
+        self._save_started_activity(operation, archived=False)
+        if sent:
+            msg(f'Activity "{comment}" restarted successfully.')
 
     def delete_activity(self, date):
         """Delete an activity."""
@@ -699,68 +1509,303 @@ class Timedctl:
         activity_obj = self.select_activity(date)
         if not self.timed.activities.delete(activity_obj[-1]):
             error_handler("ERR_ACTIVITY_DELETE_FAILED")
+        if self.store:
+            self.store.forget("activities", activity_obj[-1])
         msg(f"Activity {activity_obj[1]} deleted successfully.")
 
+    def _write(self, operation):
+        """Send a write, or queue it in the journal if timed is unreachable.
+
+        Returns whether the write was sent.
+        """
+        import requests
+
+        if not self.config.get("offline", False):
+            try:
+                # queued writes go first, to keep the order
+                if len(self.journal):
+                    self.sync()
+                if not len(self.journal):
+                    self._apply(operation)
+                    return True
+            except (requests.ConnectionError, requests.Timeout):
+                pass
+            except (ConflictError, WriteError) as exc:
+                error_handler(str(exc))
+        operation["queued"] = datetime.now().isoformat(timespec="seconds")
+        self.journal.append(operation)
+        msg(f"Queued for `timedctl sync` ({len(self.journal)} pending).")
+        return False
+
+    def _apply(self, operation, replay=False):
+        """Send a write, raising ConflictError if it doesn't fit the server state."""
+        apply = {
+            "start-activity": self._apply_activity,
+            "stop-activity": self._apply_activity,
+            "add-report": self._apply_add_report,
+            "edit-report": self._apply_edit_report,
+        }[operation["type"]]
+        # pass the user, libtimed would fetch it for every request otherwise
+        apply(operation, replay, self.prefetcher.get(*self._prefetch_me())["id"])
+        if self.store:
+            if "id" in operation:
+                self.store.forget("reports", operation["id"])
+            else:
+                kind = "reports" if operation["type"] == "add-report" else "activities"
+                self.store.forget_date(kind, operation["date"])
+
+    def _apply_activity(self, operation, replay, user):
+        """Stop the current activity and start a new one, if any."""
+        start = operation["type"] == "start-activity"
+        at = datetime.fromisoformat(
+            f"{operation['date']}T{operation['from-time' if start else 'to-time']}"
+        )
+        current = self.prefetcher.get(*self._prefetch_current_activity())
+        if current:
+            attr = current["attributes"]
+            started = datetime.combine(attr["date"], attr["from-time"].time())
+            if start and (
+                started == at
+                and attr["comment"] == operation["comment"]
+                and relationship_id(current["relationships"]["task"])
+                == operation["task"]
+            ):
+                # started before the connection dropped
+                return
+            if replay and started > at:
+                raise ConflictError("ERR_ACTIVITY_CHANGED")
+            attr["to-time"] = at
+            res = self.timed.activities.patch(
+                current["id"], attr, current["relationships"]
+            )
+            if res.status_code != HTTPStatus.OK:
+                raise WriteError("ERR_ACTIVITY_STOP_FAILED")
+        elif not start:
+            raise ConflictError("ERR_NO_CURRENT_ACTIVITY")
+        if start:
+            res = self.timed.activities.post(
+                {
+                    "comment": operation["comment"],
+                    "date": operation["date"],
+                    "from-time": operation["from-time"],
+                },
+                {"task": operation["task"], "user": user},
+            )
+            if res.status_code != HTTPStatus.CREATED:
+                raise WriteError("ERR_ACTIVITY_START_FAILED")
+
+    def _apply_add_report(self, operation, replay, user):
+        """Create a report, unless a replay finds it created already."""
+        if replay and self._find_report(
+            user,
+            operation["date"],
+            operation["task"],
+            operation["comment"],
+            parse_duration(operation["duration"]),
+        ):
+            # created before the connection dropped
+            return
+        res = self.timed.reports.post(
+            {
+                "date": operation["date"],
+                "duration": operation["duration"],
+                "comment": operation["comment"],
+            },
+            {"task": operation["task"], "user": user},
+        )
+        if res.status_code != HTTPStatus.CREATED:
+            raise WriteError("ERR_REPORT_CREATION_FAILED")
+
+    def _apply_edit_report(self, operation, replay, user):
+        """Update a report, unless a replay finds it changed in the meantime."""
+        if replay:
+            res = self.timed.session.get(
+                f"{self.timed.reports.url}/{operation['id']}", timeout=TIMEOUT
+            )
+            if res.status_code == HTTPStatus.NOT_FOUND:
+                raise ConflictError("ERR_REPORT_NOT_FOUND")
+            attr = res.json()["data"]["attributes"]
+            original = operation["original"]
+            if attr["comment"] != original["comment"] or parse_duration(
+                attr["duration"]
+            ) != parse_duration(original["duration"]):
+                raise ConflictError("ERR_REPORT_CHANGED")
+        res = self.timed.reports.patch(
+            operation["id"],
+            {"comment": operation["comment"], "duration": operation["duration"]},
+            {"task": operation["task"], "user": user},
+        )
+        if res.status_code != HTTPStatus.OK:
+            raise WriteError("ERR_REPORT_UPDATE_FAILED")
+
+    def sync(self, discard_conflicts=False):
+        """Replay the queued writes in order."""
+        try:
+            with self.journal.replaying():
+                replayed = 0
+                try:
+                    for operation in self.journal.entries():
+                        description = (
+                            f"{operation['type']} queued at {operation['queued']}"
+                        )
+                        try:
+                            self._apply(operation, replay=True)
+                        except (ConflictError, WriteError) as exc:
+                            if not discard_conflicts:
+                                msg(f"Stopped at {description}: {exc}")
+                                break
+                            msg(f"Discarded {description}: {exc}")
+                        replayed += 1
+                finally:
+                    self.journal.remove(replayed)
+        except BlockingIOError:
+            msg("The journal is already being replayed.")
+            return
+        if replayed:
+            msg(f"Writes replayed: {replayed}")
+        if pending := len(self.journal):
+            msg(f"Writes pending: {pending}")
+
+    def sync_journal(self, discard_conflicts, dry_run):
+        """Replay the queued writes, or list them."""
+        import requests
+
+        if not len(self.journal):
+            msg("No writes pending.")
+            return
+        if dry_run:
+            output_formatted(self.journal.entries(), "ndjson")
+            msg(f"Writes pending: {len(self.journal)}")
+            return
+        try:
+            self.sync(discard_conflicts)
+        except (requests.ConnectionError, requests.Timeout):
+            msg(f"Writes pending: {len(self.journal)}")
+            error_handler("ERR_TIMED_UNREACHABLE")
+
+    def _send(self, request, *args, find=None):
+        """Send a write request, retrying on connection and server errors.
+
+        Returns the data of the response. Requests creating a resource pass
+        find, which looks it up: if the server might have created it before
+        the request failed, it is looked up instead of created a second time.
+        """
+        import requests
+
+        from timedctl.session import not_sent
+
+        maybe_sent = False
+        for attempt in range(WRITE_RETRIES + 1):
+            if attempt:
+                time.sleep(WRITE_BACKOFF * 2 ** (attempt - 1))
+            if find and maybe_sent and (found := find()):
+                return found
+            try:
+                res = request(*args)
+            except requests.RequestException as exc:
+                error = str(exc)
+                maybe_sent = not not_sent(exc)
+                continue
+            if res.ok:
+                return res.json()["data"] if res.content else None
+            error = f"{res.status_code} {res.reason}"
+            maybe_sent = res.status_code != HTTPStatus.TOO_MANY_REQUESTS
+            if res.status_code < HTTPStatus.INTERNAL_SERVER_ERROR and maybe_sent:
+                break
+        raise WriteError(error)
+
+    def _find_report(self, user, day, task, comment, duration=None):
+        """Return the report of a user by date, task, comment and duration, if any."""
+        res = self.timed.session.get(
+            self.timed.reports.url,
+            params={"user": user, "date": str(day)},
+            timeout=TIMEOUT,
+        )
+        if res.status_code != HTTPStatus.OK:
+            raise WriteError(f"{res.status_code} {res.reason}")
+        for report in res.json()["data"]:
+            self.timed.reports._deserialize(report, [])
+            attributes = report["attributes"]
+            if (
+                attributes["comment"] == comment
+                and relationship_id(report["relationships"]["task"]) == task
+                and duration in (None, attributes["duration"])
+            ):
+                return report
+        return None
+
+    def _transfer(self, write, index):
+        """Transfer the activities of a planned write into their report."""
+        # pass the user, libtimed would fetch it for every request otherwise
+        relationships = {"task": write["task"], "user": self.timed.users.me["id"]}
+        # mark the activities first, so they can't be transferred twice
+        marked = []
+        try:
+            for activity_obj in write["activities"]:
+                activity_obj["attributes"]["transferred"] = True
+                self._send(
+                    self.timed.activities.patch,
+                    activity_obj["id"],
+                    activity_obj["attributes"],
+                    relationships,
+                )
+                marked.append(activity_obj)
+            if report := write["report"]:
+                attributes = {**report["attributes"], "duration": write["total"]}
+                self._send(
+                    self.timed.reports.patch, report["id"], attributes, relationships
+                )
+                report["attributes"] = attributes
+            else:
+                report = self._send(
+                    self.timed.reports.post,
+                    {"duration": write["total"], "comment": write["comment"]},
+                    relationships,
+                    find=lambda: self._find_report(
+                        relationships["user"],
+                        date.today(),
+                        write["task"],
+                        write["comment"],
+                    ),
+                )
+            index.set(write["task"], write["comment"], report, write["total"])
+        except Exception:
+            # roll back on any failure, a rerun has to pick up these activities again
+            for activity_obj in marked:
+                activity_obj["attributes"]["transferred"] = False
+                with contextlib.suppress(WriteError):
+                    self._send(
+                        self.timed.activities.patch,
+                        activity_obj["id"],
+                        activity_obj["attributes"],
+                        relationships,
+                    )
+            raise
+
     def activity_generate_timesheet(self):
         """Generate the timesheet of the current activities."""
-        activities = self.timed.activities.get()
-        reports = self.timed.reports.get()
+
+        async def reports():
+            # pass the user, libtimed would fetch it again for the filter
+            user = await self.aio.me()
+            return await self.aio.reports({"user": user["id"]})
+
+        activities, reports = self.aio.run(self.aio.activities(), reports())
         if not activities:
             error_handler("ERR_NO_ACTIVITIES")
-        for activity_obj in activities:
-            attr = activity_obj["attributes"]
-            if not attr["transferred"]:
-                # stop running activities
-                if not attr["to-time"]:
-                    attr["to-time"] = datetime.now()
-                # calculate duration
-                duration = attr["to-time"] - attr["from-time"]
-                # get task
-                task = activity_obj["relationships"]["task"]["data"]["id"]
-                # check if there is a report with the same
-                # comment that already exists
-                report = [
-                    x
-                    for x in reports
-                    if x["attributes"]["comment"] == attr["comment"]
-                    and x["relationships"]["task"]["data"]["id"] == task
-                ]
-                # if report has been found
-                if len(report) > 0:
-                    report = report[0]
-                    # deserialize the timedelta
-                    hours, minutes, seconds = report["attributes"]["duration"].split(
-                        ":",
-                    )
-                    old_duration = timedelta(
-                        hours=int(hours),
-                        minutes=int(minutes),
-                        seconds=int(seconds),
-                    )
-                    # calculate the new duration
-                    report["attributes"]["duration"] = old_duration + duration
-                    # update report
-                    self.timed.reports.patch(
-                        report["id"],
-                        report["attributes"],
-                        {"task": task},
-                    )
-                else:
-                    # create report
-                    res = self.timed.reports.post(
-                        {
-                            "duration": duration,
-                            "comment": attr["comment"],
-                        },
-                        {"task": task},
-                    )
-                    # append the report to the known reports
-                    reports.append(res.json()["data"])
-                # update activity to be transferred
-                attr["transferred"] = True
-                self.timed.activities.patch(
-                    activity_obj["id"],
-                    attr,
-                    {"task": task},
-                )
+        index = ReportIndex(reports)
+        writes = plan_timesheet(activities, index, datetime.now())
+        failed = 0
+        for write, _, error in run_concurrently(
+            lambda write: self._transfer(write, index),
+            writes,
+            self.config.get("parallel_requests", PARALLEL_REQUESTS),
+        ):
+            if error:
+                failed += 1
+                msg(f'Failed to transfer "{write["comment"]}": {error}')
+        # running activities were stopped by the transfer
+        self._save_current_activity(None)
+        if failed:
+            error_handler("ERR_TIMESHEET_INCOMPLETE")
         msg("Timesheet generated successfully.")
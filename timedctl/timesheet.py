@@ -0,0 +1,79 @@
+"""
+Plan the transfer of activities into reports.
+"""
+
+from datetime import datetime, timedelta
+
+from timedctl.resolver import relationship_id
+
+
+def parse_duration(duration):
+    """Parse a "[D ]HH:MM:SS" duration unless libtimed did already."""
+    if isinstance(duration, timedelta):
+        return duration
+    days, _, duration = duration.rpartition(" ")
+    hours, minutes, seconds = map(int, duration.split(":"))
+    return timedelta(days=int(days or 0), hours=hours, minutes=minutes, seconds=seconds)
+
+
+class ReportIndex:
+    """Reports by task id and comment, along with their parsed durations."""
+
+    def __init__(self, reports):
+        self.reports = {}
+        for report in reports:
+            key = (
+                relationship_id(report["relationships"]["task"]),
+                report["attributes"]["comment"],
+            )
+            # the first report wins, like it did with a linear search
+            if key not in self.reports:
+                self.set(*key, report)
+
+    def get(self, task, comment):
+        """Return the report and its duration, or None and zero."""
+        return self.reports.get((task, comment), (None, timedelta()))
+
+    def set(self, task, comment, report, duration=None):
+        """Add a created report or update the duration of a patched one."""
+        if duration is None:
+            duration = parse_duration(report["attributes"]["duration"])
+        self.reports[(task, comment)] = (report, duration)
+
+
+def plan_timesheet(activities, index, now):
+    """Group the untransferred activities into one write per report.
+
+    Activities with the same task and comment end up in the same report,
+    running activities are stopped at `now`. Returns a list of writes, each
+    with the task, comment, activities, the existing report to update (or
+    None if a report has to be created) and the total duration of it.
+    """
+    writes = {}
+    for activity_obj in activities:
+        attr = activity_obj["attributes"]
+        if attr["transferred"]:
+            continue
+        # stop running activities
+        if not attr["to-time"]:
+            attr["to-time"] = datetime.combine(
+                attr["from-time"].date(), now.time().replace(microsecond=0)
+            )
+        task = relationship_id(activity_obj["relationships"]["task"])
+        write = writes.setdefault(
+            (task, attr["comment"]),
+            {
+                "task": task,
+                "comment": attr["comment"],
+                "duration": timedelta(),
+                "activities": [],
+            },
+        )
+        write["duration"] += attr["to-time"] - attr["from-time"]
+        write["activities"].append(activity_obj)
+
+    # check if there are reports with the same task and comment already
+    for write in writes.values():
+        write["report"], duration = index.get(write["task"], write["comment"])
+        write["total"] = duration + write["duration"]
+    return list(writes.values())
@@ -0,0 +1,135 @@
+"""
+Storage of the SSO tokens, in a single keyring entry or an encrypted file.
+"""
+
+import contextlib
+import hashlib
+import json
+import math
+import os
+import tempfile
+import time
+
+from timedctl.helpers import error_handler
+from timedctl.journal import state_home
+
+KEYRING_SERVICE = "system"
+# environment variable holding the Fernet key of the file store
+KEY_VARIABLE = "TIMEDCTL_TOKEN_KEY"
+
+
+def _expiry(token):
+    """Return the expiry of a JWT without verifying it, None if it has none."""
+    import jwt
+
+    try:
+        return jwt.decode(token, options={"verify_signature": False}).get("exp")
+    except jwt.exceptions.DecodeError:
+        return 0
+
+
+def token_bundle(access_token, refresh_token):
+    """Bundle the tokens with their expiry, so reading them needs no decoding."""
+    return {
+        "access": access_token,
+        "access_exp": _expiry(access_token) if access_token else 0,
+        "refresh": refresh_token,
+        "refresh_exp": _expiry(refresh_token) if refresh_token else 0,
+    }
+
+
+def remaining(bundle, kind):
+    """Return the seconds until the access or refresh token of a bundle expires."""
+    if not bundle.get(kind):
+        return -math.inf
+    expiry = bundle.get(f"{kind}_exp")
+    return math.inf if expiry is None else expiry - time.time()
+
+
+class KeyringStore:
+    """Tokens in a single entry of the system keyring."""
+
+    def __init__(self, client_id):
+        self.name = f"timedctl_token_{client_id}"
+
+    def load(self):
+        """Return the stored tokens, None if there are none."""
+        import keyring
+
+        if stored := keyring.get_password(KEYRING_SERVICE, self.name):
+            return json.loads(stored)
+        return self._migrate()
+
+    def _migrate(self):
+        """Move the tokens from the two entries older versions used."""
+        import keyring
+
+        names = [f"{self.name}_access", f"{self.name}_refresh"]
+        tokens = [keyring.get_password(KEYRING_SERVICE, name) for name in names]
+        if not any(tokens):
+            return None
+        bundle = token_bundle(*tokens)
+        self.save(bundle)
+        for name, token in zip(names, tokens, strict=True):
+            if token:
+                with contextlib.suppress(keyring.errors.PasswordDeleteError):
+                    keyring.delete_password(KEYRING_SERVICE, name)
+        return bundle
+
+    def save(self, bundle):
+        """Store the tokens."""
+        import keyring
+
+        keyring.set_password(KEYRING_SERVICE, self.name, json.dumps(bundle))
+
+
+class FileStore:
+    """Tokens in a file encrypted with a key from the environment.
+
+    For machines without a keyring, needs the optional cryptography package.
+    """
+
+    def __init__(self, client_id):
+        digest = hashlib.sha256(client_id.encode()).hexdigest()[:16]
+        self.path = os.path.join(state_home(), "tokens", digest)
+
+    def _fernet(self):
+        try:
+            from cryptography.fernet import Fernet
+        except ImportError:
+            error_handler("ERR_CRYPTOGRAPHY_NOT_INSTALLED")
+        if not (key := os.getenv(KEY_VARIABLE)):
+            error_handler("ERR_TOKEN_KEY_MISSING")
+        try:
+            return Fernet(key)
+        except ValueError:
+            error_handler("ERR_INVALID_TOKEN_KEY")
+
+    def load(self):
+        """Return the stored tokens, None if there are none or the key changed."""
+        fernet = self._fernet()
+        from cryptography.fernet import InvalidToken
+
+        try:
+            with open(self.path, "rb") as file:
+                return json.loads(fernet.decrypt(file.read()))
+        except (FileNotFoundError, InvalidToken):
+            return None
+
+    def save(self, bundle):
+        """Store the tokens."""
+        encrypted = self._fernet().encrypt(json.dumps(bundle).encode())
+        os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+        # mkstemp creates the file readable by the user only
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path))
+        with os.fdopen(fd, "wb") as file:
+            file.write(encrypted)
+        os.replace(tmp_path, self.path)
+
+
+def token_store(kind, client_id):
+    """Return the store of the tokens configured with `token_store`."""
+    stores = {"keyring": KeyringStore, "file": FileStore}
+    if kind not in stores:
+        error_handler("ERR_INVALID_TOKEN_STORE")
+    return stores[kind](client_id)